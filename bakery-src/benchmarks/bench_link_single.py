@@ -0,0 +1,123 @@
+"""Compare resolving the REX links of a generated book through the page slug
+and composite page lookup tables of link_single with walking the book tree
+and scanning the composite pages for every link.
+
+    python benchmarks/bench_link_single.py [--pages 2000] [--links 3]
+
+Needs the bakery scripts installed (``pip install -e scripts``).
+"""
+import argparse
+import uuid
+from copy import deepcopy
+from timeit import default_timer as timer
+
+from lxml import etree
+
+from bakery_scripts import link_single
+
+
+BOOK_UUID = str(uuid.uuid4())
+CHAPTER_SIZE = 20
+COMPOSITE_PAGES = 100
+
+
+def gen_book(pages, links):
+    """A book tree and its baked XHTML with ``links`` REX links per page"""
+    page_uuids = [str(uuid.uuid4()) for _ in range(pages)]
+    composite_uuids = [str(uuid.uuid4()) for _ in range(COMPOSITE_PAGES)]
+    tree = {"id": f"{BOOK_UUID}@1", "slug": "book", "contents": []}
+    for start in range(0, pages, CHAPTER_SIZE):
+        chapter = {
+            "id": f"{uuid.uuid4()}@1",
+            "slug": f"chapter-{start}",
+            "contents": [
+                {"id": f"{page_uuid}@", "slug": f"page-{page_uuid}"}
+                for page_uuid in page_uuids[start:start + CHAPTER_SIZE]
+            ],
+        }
+        tree["contents"].append(chapter)
+    tree["contents"].extend(
+        {"id": f"{composite_uuid}@", "slug": f"composite-{i}"}
+        for i, composite_uuid in enumerate(composite_uuids)
+    )
+    composite_pages = [
+        [f"composite-page-{i}", composite_uuid]
+        for i, composite_uuid in enumerate(composite_uuids)
+    ]
+
+    link = '<a data-needs-rex-link="true">link</a>'
+    body = [
+        '<div data-type="metadata"><span data-type="canonical-book-uuid"'
+        f' data-value="{BOOK_UUID}"/></div>'
+    ]
+    body.extend(
+        f'<div data-type="page" id="page_{page_uuid}">{link * links}</div>'
+        for page_uuid in page_uuids
+    )
+    body.extend(
+        f'<div data-type="composite-page" id="{page_id}">{link * links}</div>'
+        for page_id, _ in composite_pages
+    )
+    xhtml = (
+        '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+        f'{"".join(body)}</body></html>'
+    )
+    return tree, composite_pages, etree.fromstring(xhtml).getroottree()
+
+
+def gen_walking_resolvers(book_tree_by_uuid, composite_pages_by_book_uuid):
+    """Resolvers that search the book for every link"""
+
+    def _get_page_slug(book_uuid, page_uuid):
+        return link_single._find_page_slug(
+            book_tree_by_uuid[book_uuid], page_uuid
+        )
+
+    def _get_composite_page_slug(book_uuid, composite_page_id):
+        for page_id, model_id in composite_pages_by_book_uuid[book_uuid]:
+            if page_id == composite_page_id:
+                return _get_page_slug(book_uuid, model_id)
+        return None
+
+    return _get_page_slug, _get_composite_page_slug
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--links", type=int, default=3)
+    args = parser.parse_args()
+
+    tree, composite_pages, doc = gen_book(args.pages, args.links)
+    book_tree_by_uuid = {BOOK_UUID: tree}
+    composite_pages_by_book_uuid = {BOOK_UUID: composite_pages}
+    slug_by_uuid = {BOOK_UUID: "book"}
+    link_count = (args.pages + COMPOSITE_PAGES) * args.links
+    print(f"{args.pages} pages, {link_count} REX links")
+
+    page_slug_resolver = link_single.gen_page_slug_resolver(book_tree_by_uuid)
+    resolvers = {
+        "walking the tree": gen_walking_resolvers(
+            book_tree_by_uuid, composite_pages_by_book_uuid
+        ),
+        "lookup tables": (
+            page_slug_resolver,
+            link_single.gen_composite_page_slug_resolver(
+                composite_pages_by_book_uuid, page_slug_resolver
+            ),
+        ),
+    }
+    results = {}
+    for name, (page_resolver, composite_resolver) in resolvers.items():
+        linked = deepcopy(doc)
+        start = timer()
+        link_single.transform_rex_links(
+            linked, slug_by_uuid, page_resolver, composite_resolver
+        )
+        print(f"{name}: {timer() - start:.3f}s")
+        results[name] = etree.tostring(linked)
+    assert len(set(results.values())) == 1, "Resolvers disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,46 @@
 import json
 import sys
+from pathlib import Path
+from types import SimpleNamespace
 
 from lxml import etree
 
 from .utils import model_to_tree, ensure_isoformat
 from .profiler import timed
-from .html_parser import DocumentMetadataParser, reconstitute
+from .html_parser import DocumentMetadataParser, reconstitute_tree
+from .binder_snapshot import load_snapshot, save_snapshot
 from . import excepthook
 
 
 excepthook.attach(sys)
 
+BOOK_METADATA_KEYS = (
+    "title", "revised", "version", "license_url", "license_text", "language",
+    "slug",
+)
+
 
 @timed
 def main():
     raw_metadata_file, baked_xhtml_file, collection_uuid, book_slugs_file, baked_metadata_file = sys.argv[
         1:6]
 
-    with open(baked_xhtml_file, "r") as baked_xhtml:
-        html = etree.parse(baked_xhtml)
-        metadata = DocumentMetadataParser(html)
-        binder = reconstitute(baked_xhtml)
+    # The snapshot is saved beside the baked metadata for the later steps
+    meta_dir = Path(baked_metadata_file).parent
+    snapshot = load_snapshot(meta_dir, baked_xhtml_file)
+    if snapshot is not None:
+        binder, tree = snapshot.binder, snapshot.tree
+        metadata = SimpleNamespace(**snapshot.metadata)
+    else:
+        with open(baked_xhtml_file, "r") as baked_xhtml:
+            html = etree.parse(baked_xhtml)
+        # Read the book metadata before the pages are moved out of the tree
+        parser = DocumentMetadataParser(html)
+        book_metadata = {key: getattr(parser, key) for key in BOOK_METADATA_KEYS}
+        metadata = SimpleNamespace(**book_metadata)
+        binder = reconstitute_tree(html)
+        tree = model_to_tree(binder)
+        save_snapshot(meta_dir, baked_xhtml_file, binder, book_metadata, tree)
 
     with open(raw_metadata_file, "r") as raw_json:
         baked_metadata = json.load(raw_json)
@@ -36,8 +56,6 @@ def main():
     else:
         book_slug = metadata.slug
 
-    tree = model_to_tree(binder)
-
     # Use any existing book metadata to determine whether to fallback to
     # values from the XHTML metadata
     book_metadata = baked_metadata.get(binder.ident_hash, {})
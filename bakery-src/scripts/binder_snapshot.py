@@ -0,0 +1,147 @@
+"""Snapshots of the models reconstituted from a book's XHTML, so that the
+steps after baking can load them instead of reconstituting the whole book
+again.
+
+A snapshot is kept in a metadata directory as ``<xhtml name>.binder.json``,
+which holds the ToC tree with slugs and the structure of the binder with
+the id and metadata of every node, and ``<xhtml name>.binder.pages``, which
+holds the serialized content of the documents at the byte ranges noted in
+the JSON. A snapshot is only used while the digest of the XHTML matches the
+one it was made from.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from .cnx_models import Binder, CompositeDocument, Document
+from .html_parser import reconstitute
+from .profiler import timed
+from .utils import BUF_SIZE, model_to_tree
+
+SNAPSHOT_VERSION = 1
+
+MODEL_TYPES = {
+    'binder': Binder,
+    'document': Document,
+    'composite-document': CompositeDocument,
+}
+MODEL_TYPE_NAMES = {
+    model_type: name for name, model_type in MODEL_TYPES.items()
+}
+
+
+def snapshot_paths(meta_dir, xhtml_path):
+    """Paths of the JSON and the page content of the snapshot of
+    ``xhtml_path`` in ``meta_dir``"""
+    name = Path(xhtml_path).name
+    return (
+        Path(meta_dir) / f'{name}.binder.json',
+        Path(meta_dir) / f'{name}.binder.pages',
+    )
+
+
+@timed
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(BUF_SIZE), b''):
+            sha1.update(data)
+    return sha1.hexdigest()
+
+
+def _dump_model(model, pages):
+    node = {
+        'type': MODEL_TYPE_NAMES[type(model)],
+        'id': model.id,
+        'metadata': model.metadata,
+    }
+    if isinstance(model, Document):
+        content = model.content
+        node['content'] = [pages.tell(), len(content)]
+        pages.write(content)
+    else:
+        node['contents'] = [_dump_model(child, pages) for child in model]
+        node['titles'] = [model.get_title_for_node(child) for child in model]
+    return node
+
+
+@timed
+def save_snapshot(meta_dir, xhtml_path, binder, metadata=None, tree=None):
+    """Save a snapshot of ``binder``, reconstituted from ``xhtml_path``,
+    along with the book ``metadata`` read from the XHTML"""
+    json_path, pages_path = snapshot_paths(meta_dir, xhtml_path)
+    # The page content of an older snapshot is about to be replaced
+    json_path.unlink(missing_ok=True)
+    with open(pages_path, 'wb') as pages:
+        binder_node = _dump_model(binder, pages)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'digest': file_digest(xhtml_path),
+        'metadata': metadata or {},
+        'tree': tree if tree is not None else model_to_tree(binder),
+        'binder': binder_node,
+    }
+    with open(json_path, 'w') as f:
+        json.dump(snapshot, f)
+
+
+class BinderSnapshot:
+    """The ``binder``, ``tree`` and book ``metadata`` of a snapshot. The
+    content of a document is only read when it is needed."""
+
+    def __init__(self, snapshot, pages_path):
+        self.metadata = snapshot['metadata']
+        self.tree = snapshot['tree']
+        self.pages_path = pages_path
+        self.binder = self._load_model(snapshot['binder'])
+
+    def _read_content(self, start, length):
+        with open(self.pages_path, 'rb') as pages:
+            pages.seek(start)
+            return pages.read(length)
+
+    def _load_model(self, node):
+        model_type = MODEL_TYPES[node['type']]
+        if issubclass(model_type, Document):
+            start, length = node['content']
+            return model_type.from_serialized(
+                node['id'],
+                lambda: self._read_content(start, length),
+                metadata=node['metadata'],
+            )
+        return model_type(
+            node['id'],
+            nodes=[self._load_model(child) for child in node['contents']],
+            metadata=node['metadata'],
+            title_overrides=node['titles'],
+        )
+
+
+@timed
+def load_snapshot(meta_dir, xhtml_path):
+    """Load the snapshot of ``xhtml_path`` from ``meta_dir``. Returns None
+    when there is none or when the XHTML changed since it was saved."""
+    json_path, pages_path = snapshot_paths(meta_dir, xhtml_path)
+    try:
+        with open(json_path, 'r') as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if (
+        snapshot.get('version') != SNAPSHOT_VERSION or
+        snapshot.get('digest') != file_digest(xhtml_path) or
+        not pages_path.exists()
+    ):
+        return None
+    return BinderSnapshot(snapshot, pages_path)
+
+
+@timed
+def load_binder(meta_dir, xhtml_path):
+    """Load the binder of ``xhtml_path`` from its snapshot in ``meta_dir``,
+    or reconstitute it from the XHTML when there is no current snapshot"""
+    snapshot = load_snapshot(meta_dir, xhtml_path)
+    if snapshot is not None:
+        return snapshot.binder
+    with open(xhtml_path, 'r') as xhtml:
+        return reconstitute(xhtml)
@@ -202,23 +202,26 @@ def _discover_uri_type(uri):
 
 
 @timed
-def _parse_references(xml):
+def _parse_references(xml, document=None):
     """Parse the references to ``Reference`` instances."""
     references = []
     ref_finder = HTMLReferenceFinder(xml)
     for elm, uri_attr in ref_finder:
         type_ = _discover_uri_type(elm.get(uri_attr))
-        references.append(Reference(elm, type_, uri_attr))
+        references.append(Reference(elm, type_, uri_attr, document))
     return references
 
 
 class Reference(object):
     """A reference within a ``Document`` model, either internal or external.
     This depends on an xml element tree, to provide binds for uri and name.
+    The ``document`` the element belongs to, if any, is told when the uri
+    changes.
     """
 
-    def __init__(self, elm, remote_type, uri_attr):
+    def __init__(self, elm, remote_type, uri_attr, document=None):
         self.elm = elm
+        self.document = document
         try:
             assert remote_type in REFERENCE_REMOTE_TYPES
         except AssertionError:  # pragma: no cover
@@ -248,7 +251,7 @@ class Reference(object):
         if self.is_bound:
             raise ValueError(
                 "URI is bound to an object. Unbind first.")  # pragma: no cover
-        self.elm.set(self._uri_attr, value)
+        self._set_attr(value)
 
     uri = property(_get_uri, _set_uri)
 
@@ -260,7 +263,14 @@ class Reference(object):
     def _set_uri_from_bound_model(self):
         """Using the bound model, set the uri."""
         value = self._uri_template.format(self._bound_model.id)
+        self._set_attr(value)
+
+    def _set_attr(self, value):
+        if self.elm.get(self._uri_attr) == value:
+            return
         self.elm.set(self._uri_attr, value)
+        if self.document is not None:
+            self.document._content_changed()
 
     def bind(self, model, template="{}"):
         """Bind the ``model`` to the reference. This uses the model's
@@ -432,41 +442,87 @@ class Binder(TranslucentBinder):
 class Document(object):
     """An HTML document noted as ``content`` on the instance,
     which can contain ``Resource`` instances.
+    The content is held as the ``tree`` of its ``body`` element and only
+    serialized when ``content`` is read after the tree may have changed.
     """
     media_type = 'application/xhtml+xml'
 
     def __init__(self, id, data, metadata=None, resources=None,
                  reference_resolver=None):
         self._xml = None
+        self._content = None
+        self._load_content = None
+        self._references = None
         if hasattr(data, 'read'):
             self.content = utf8(data.read())
+        elif etree.iselement(data):
+            self.content = data
         else:
             self.content = utf8(data)
-        self._references = _parse_references(self._xml)
         self.metadata = utf8(metadata or {})
         self.resources = resources or []
         self.id = id
 
+    @classmethod
+    def from_serialized(cls, id, load_content, metadata=None):
+        """Build a document from content serialized by another document.
+        ``load_content`` is called for it when the content or tree is first
+        needed.
+        """
+        document = cls(id, '', metadata=metadata)
+        document._xml = None
+        document._load_content = load_content
+        return document
+
     def _content__get(self):
         """Produce the content from the data.
         This is used to write out reference changes that may have
         taken place.
         """
-        return etree_to_content(self._xml)
+        if self._content is None:
+            if self._xml is None:
+                self._content = self._load_content()
+            else:
+                self._content = etree_to_content(self._xml)
+        return self._content
 
     def _content__set(self, value):
-        self._xml = content_to_etree(value)
+        """Set the content from serialized content or from a ``body``
+        element, which is then owned by the document.
+        """
+        if etree.iselement(value):
+            self._xml = value
+        else:
+            self._xml = content_to_etree(value)
+        self._content = None
         # reload the references after a content update
-        self._references = _parse_references(self._xml)
+        self._references = None
 
     def _content__del(self):  # pragma: no cover
         self._xml = content_to_etree('')
+        self._content = None
+        self._references = None
 
     content = property(_content__get,
                        _content__set,
                        _content__del,
                        _content__get.__doc__)
 
+    @property
+    def tree(self):
+        """The ``body`` element of the content, to be read or changed in
+        place. The content is serialized again the next time it is read,
+        so get ``tree`` again to change it after reading ``content``.
+        """
+        if self._xml is None:
+            self._xml = content_to_etree(self.content)
+        self._content_changed()
+        return self._xml
+
+    def _content_changed(self):
+        """Serialize the tree again the next time the content is read"""
+        self._content = None
+
     @property
     def id(self):
         return self._id
@@ -520,7 +576,8 @@ class Document(object):
         These could be resources, other documents, external links, etc.
         """
         if self._references is None:
-            return []  # pragma: no cover
+            # References tell the document when they change the tree
+            self._references = _parse_references(self.tree, self)
         return self._references
 
 
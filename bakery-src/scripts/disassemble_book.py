@@ -6,8 +6,9 @@ from pathlib import Path
 from lxml import etree
 from lxml.builder import ElementMaker, E
 
-from .html_parser import reconstitute, HTML_DOCUMENT_NAMESPACES
-from .cnx_models import flatten_to_documents, content_to_etree, etree_to_content
+from .html_parser import reconstitute_tree, HTML_DOCUMENT_NAMESPACES
+from .binder_snapshot import load_snapshot
+from .cnx_models import flatten_to_documents
 from .cnx_formatters import DocumentContentFormatter
 from .utils import model_to_tree
 from .profiler import timed
@@ -53,8 +54,14 @@ def main():
 
     with open(xhtml_file, "rb") as file:
         html_root = etree.parse(file)
-        file.seek(0)
-        binder = reconstitute(file)
+    snapshot = load_snapshot(metadata_file.parent, xhtml_file)
+    if snapshot is not None:
+        binder = snapshot.binder
+        slugs = {}
+        extract_slugs_from_tree(snapshot.tree, slugs)
+    else:
+        # The navigation stays in html_root, only the pages are moved out
+        binder = reconstitute_tree(html_root)
         slugs = extract_slugs_from_binder(binder)
 
     with open(metadata_file, "r") as baked_json:
@@ -74,7 +81,7 @@ def main():
     for doc in flatten_to_documents(binder):
         id_with_context = f'{binder.ident_hash}:{doc.id}'
 
-        module_etree = content_to_etree(doc.content)
+        module_etree = doc.tree
         for link in nav_links:
             link_href = link.attrib['href']
             if not link_href.startswith('#'):
@@ -114,8 +121,6 @@ def main():
                 node.attrib["data-page-uuid"] = page_uuid
                 node.attrib["data-page-fragment"] = page_fragment
 
-        doc.content = etree_to_content(module_etree)
-
         # Inject some styling and JS for QA
         xml_parser = etree.XMLParser(ns_clean=True)
         root = etree.XML(bytes(DocumentContentFormatter(doc)), xml_parser)
@@ -3,8 +3,7 @@ import logging
 import re
 import uuid
 from lxml import etree, html
-from .cnx_models import (Binder, content_to_etree, etree_to_content,
-                         Document, CompositeDocument, flatten_to_documents)
+from .cnx_models import (Binder, content_to_etree, Document, CompositeDocument, flatten_to_documents)
 from .profiler import timed
 
 TRANSLUCENT_BINDER_ID = 'subcol'
@@ -132,9 +131,19 @@ def parse_resources(html):
 def reconstitute(html):
     """Given a file-like object as ``html``, reconstruct it into models."""
     html.seek(0)
-    htree = etree.parse(html)
-    xhtml = etree.tostring(htree, encoding='utf-8')
-    return adapt_single_html(xhtml)
+    return reconstitute_tree(etree.parse(html))
+
+
+@timed
+def reconstitute_tree(tree):
+    """Given an already parsed ``tree`` (an etree object), reconstruct it
+    into models without parsing it again.
+    The page elements are moved out of ``tree`` into the documents, so read
+    anything else needed from the pages before calling this.
+    """
+    if hasattr(tree, 'getroot'):
+        tree = tree.getroot()
+    return _adapt_html_root(tree)
 
 
 @timed
@@ -142,8 +151,10 @@ def adapt_single_html(html):
     """Adapts a single html document generated by
     ``.formatters.SingleHTMLFormatter`` to a ``models.Binder``
     """
-    html_root = etree.fromstring(html)
+    return _adapt_html_root(etree.fromstring(html))
 
+
+def _adapt_html_root(html_root):
     metadata = parse_metadata(html_root.xpath('//*[@data-type="metadata"]')[0])
     id_ = metadata['cnx-archive-uri'] or 'book'
 
@@ -170,7 +181,7 @@ def _adapt_single_html_tree(parent, elem, nav_tree, top_metadata,
     def fix_generated_ids(page, id_map):
         """Fix element ids (remove auto marker) and populate id_map."""
 
-        content = content_to_etree(page.content)
+        content = page.tree
 
         new_ids = set()
         suffix = 0
@@ -209,12 +220,10 @@ def _adapt_single_html_tree(parent, elem, nav_tree, top_metadata,
         assert not (page.id and '@' in page.id)
         id_map['#{}'.format(page.id.split('@')[0])] = (page, '')
 
-        page.content = etree_to_content(content)
-
     def fix_links(page, id_map):
         """Remap all intra-book links, replace with value from id_map."""
 
-        content = content_to_etree(page.content)
+        content = page.tree
         for i in content.xpath('.//*[starts-with(@href, "#")]',
                                namespaces=HTML_DOCUMENT_NAMESPACES):
             ref_val = i.attrib['href']
@@ -231,8 +240,6 @@ def _adapt_single_html_tree(parent, elem, nav_tree, top_metadata,
             else:
                 logging.error(f'Bad href: {ref_val}')  # pragma: no cover
 
-        page.content = etree_to_content(content)
-
     def _compute_id(p, elem, key):
         """Compute id and shortid from parent uuid and child attr"""
         p_ids = [p.id.split('@')[0]]
@@ -346,13 +353,12 @@ def _adapt_single_html_tree(parent, elem, nav_tree, top_metadata,
 
             document_body = content_to_etree('')
             document_body.append(child)
-            contents = etree.tostring(document_body)
             model = {
                 'page': Document,
                 'composite-page': CompositeDocument,
             }[child.attrib['data-type']]
 
-            document = model(id_, contents, metadata=metadata)
+            document = model(id_, document_body, metadata=metadata)
             parent.append(document)
 
             fix_generated_ids(document, id_map)  # also populates id_map
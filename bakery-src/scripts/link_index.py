@@ -0,0 +1,131 @@
+"""An index of the books in a baked directory for link-single.
+
+link-single runs once per book and needs to know about the pages of every
+book, so the books are read once to build the index instead of once per
+run. The index is kept in the baked metadata directory, and a book is only
+read again when its baked XHTML or its baked metadata changes.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from .binder_snapshot import load_binder
+from .cnx_models import CompositeDocument, flatten_model, flatten_to_documents
+from .profiler import timed
+
+LINK_INDEX_FILENAME = 'link-index.json'
+LINK_INDEX_VERSION = 1
+BOOK_METADATA_KEYS = ('id', 'slug', 'tree')
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@timed
+def index_book(baked_collection, meta_dir):
+    """Read what link-single needs to know about a book: the canonical book
+    of each page, the book's baked metadata and the composite page id of
+    each composite document"""
+    binder = load_binder(meta_dir, baked_collection)
+    metadata_path = (
+        Path(meta_dir) / f'{binder.metadata["slug"]}.baked-metadata.json'
+    )
+    with open(metadata_path, 'r') as metadata_file:
+        book_metadata = json.load(metadata_file)[binder.ident_hash]
+
+    composite_pages = []
+    seen_ids = set()
+    for model in flatten_model(binder):
+        if not isinstance(model, CompositeDocument):
+            continue
+        # Composite pages that share a uuid-key share an id, and only the
+        # first of them can be linked to
+        if model.id in seen_ids:
+            continue
+        seen_ids.add(model.id)
+        id_search = model.tree.xpath('.//*[@data-type="composite-page"]/@id')
+        if id_search:
+            composite_pages.append([id_search[0], model.id])
+
+    return {
+        'baked': _stat_key(baked_collection),
+        'metadata_path': str(metadata_path),
+        'metadata': _stat_key(metadata_path),
+        'id': binder.id,
+        'book_metadata': {key: book_metadata[key] for key in BOOK_METADATA_KEYS},
+        'pages': {
+            doc.id: doc.metadata['canonical_book_uuid']
+            for doc in flatten_to_documents(binder)
+        },
+        'composite_pages': composite_pages,
+    }
+
+
+def _is_current(book, baked_collection):
+    if book is None or book['baked'] != _stat_key(baked_collection):
+        return False
+    try:
+        return book['metadata'] == _stat_key(book['metadata_path'])
+    except FileNotFoundError:
+        return False
+
+
+class LinkIndex:
+    """The indexed books, in the order their baked XHTML was found"""
+
+    def __init__(self, books):
+        self.books = books
+
+    @property
+    def canonical_map(self):
+        """The canonical book uuid of every page"""
+        canonical_map = {}
+        for book in self.books:
+            canonical_map.update(book['pages'])
+        return canonical_map
+
+    @property
+    def book_metadata(self):
+        return [book['book_metadata'] for book in self.books]
+
+    @property
+    def composite_pages_by_book_uuid(self):
+        """The ``[composite page id, composite document id]`` pairs of every
+        book"""
+        return {book['id']: book['composite_pages'] for book in self.books}
+
+
+@timed
+def load_link_index(baked_dir, meta_dir):
+    """Load the index of the books in ``baked_dir`` from ``meta_dir``,
+    indexing the books that are new or changed and saving it again"""
+    index_path = Path(meta_dir) / LINK_INDEX_FILENAME
+    try:
+        saved = json.loads(index_path.read_text())
+    except (FileNotFoundError, ValueError):
+        saved = {}
+    if saved.get('version') != LINK_INDEX_VERSION:
+        saved = {'books': {}}
+
+    books = {}
+    changed = False
+    for baked_collection in Path(baked_dir).glob('*.baked.xhtml'):
+        name = baked_collection.name
+        book = saved['books'].get(name)
+        if not _is_current(book, baked_collection):
+            book = index_book(baked_collection, meta_dir)
+            changed = True
+        books[name] = book
+
+    if changed or books.keys() != saved['books'].keys():
+        fd, tmp_path = tempfile.mkstemp(dir=meta_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as index_file:
+            json.dump(
+                {'version': LINK_INDEX_VERSION, 'books': books}, index_file
+            )
+        os.replace(tmp_path, index_path)
+
+    return LinkIndex(list(books.values()))
@@ -5,15 +5,14 @@ uuids from the target module and corresponding canonical book       .
 
 import sys
 import argparse
-import json
 import re
-from pathlib import Path
 from urllib.parse import unquote
 
 from lxml import etree
 
-from .html_parser import reconstitute
-from .cnx_models import flatten_to_documents, flatten_model, CompositeDocument
+from .binder_snapshot import save_snapshot
+from .html_parser import reconstitute_tree
+from .link_index import load_link_index
 from .profiler import timed
 from .utils import build_rex_url
 from . import excepthook
@@ -29,48 +28,6 @@ def load_baked_collection(input_dir, book_slug):
     return etree.parse(baked_collection)
 
 
-@timed
-def parse_collection_binders(input_dir):
-    """Create a list of binders from book collections"""
-    baked_collections = Path(input_dir).glob("*.baked.xhtml")
-    binders = []
-
-    for baked_collection in baked_collections:
-        with open(baked_collection, "r") as baked_file:
-            binder = reconstitute(baked_file)
-            binders.append(binder)
-
-    return binders
-
-
-@timed
-def create_canonical_map(binders):
-    """Create a canonical book map from a set of binders"""
-    canonical_map = {}
-
-    for binder in binders:
-        for doc in flatten_to_documents(binder):
-            canonical_map[doc.id] = doc.metadata['canonical_book_uuid']
-
-    return canonical_map
-
-
-@timed
-def parse_book_metadata(binders, input_dir):
-    """Create a list of book metadata for a set of binders using collection
-    metadata files"""
-    book_metadata = []
-
-    for binder in binders:
-        slug = binder.metadata["slug"]
-        baked_metadata_file = Path(input_dir) / f"{slug}.baked-metadata.json"
-        with open(baked_metadata_file, "r") as metadata_file:
-            metadata = json.load(metadata_file)
-            book_metadata.append(metadata[binder.ident_hash])
-
-    return book_metadata
-
-
 @timed
 def get_target_uuid(link):
     """get target module uuid"""
@@ -81,28 +38,48 @@ def get_target_uuid(link):
         parsed).group(1)
 
 
+def _find_page_slug(tree, page_uuid):
+    """Recursively walk through tree to find page slug"""
+    curr_slug = tree["slug"]
+    curr_id = tree["id"]
+    if curr_id.startswith(page_uuid):
+        return curr_slug
+    if "contents" in tree:
+        for node in tree["contents"]:
+            slug = _find_page_slug(node, page_uuid)
+            if slug:
+                return slug
+    return None
+
+
+def _index_page_slugs(tree, slugs):
+    """Add the slug of every node in tree by its id without version,
+    keeping the first one like _find_page_slug"""
+    if tree["slug"]:
+        slugs.setdefault(tree["id"].split("@")[0], tree["slug"])
+    for node in tree.get("contents", ()):
+        _index_page_slugs(node, slugs)
+    return slugs
+
+
 @timed
 def gen_page_slug_resolver(book_tree_by_uuid):
     """Generate a page slug resolver function"""
 
+    slugs_by_book_uuid = {}
+
     def _get_page_slug(book_uuid, page_uuid):
         """Get page slug from book"""
 
-        def _parse_tree_for_slug(tree, page_uuid):
-            """Recursively walk through tree to find page slug"""
-            curr_slug = tree["slug"]
-            curr_id = tree["id"]
-            if curr_id.startswith(page_uuid):
-                return curr_slug
-            if "contents" in tree:
-                for node in tree["contents"]:
-                    slug = _parse_tree_for_slug(node, page_uuid)
-                    if slug:
-                        return slug
-            return None
-
-        page_slug = _parse_tree_for_slug(
-            book_tree_by_uuid[book_uuid], page_uuid)
+        tree = book_tree_by_uuid[book_uuid]
+        slugs = slugs_by_book_uuid.get(book_uuid)
+        if slugs is None:
+            slugs = slugs_by_book_uuid[book_uuid] = _index_page_slugs(tree, {})
+        page_slug = slugs.get(page_uuid)
+        if page_slug is None:
+            # Ids are matched by prefix, which the table only covers for
+            # complete uuids
+            page_slug = _find_page_slug(tree, page_uuid)
 
         return page_slug
 
@@ -110,34 +87,24 @@ def gen_page_slug_resolver(book_tree_by_uuid):
 
 
 @timed
-def gen_composite_page_slug_resolver(binders_by_book_uuid, page_slug_resolver):
+def gen_composite_page_slug_resolver(composite_pages_by_book_uuid,
+                                     page_slug_resolver):
     """Generate a composite page slug resolver function"""
 
-    parsed_by_id = {}
+    uuids_by_book_uuid = {}
 
     def _get_composite_page_uuid(book_uuid, composite_page_id):
-        """Get composite page uuid from binder"""
-
-        binder = binders_by_book_uuid.get(book_uuid)
-        if binder:
-            encoded_page_id = composite_page_id.encode("utf-8")
-            for model in flatten_model(binder):
-                if not isinstance(model, CompositeDocument):
-                    continue
-
-                model_id, content = model.id, model.content
-                if encoded_page_id in content:
-                    parsed = parsed_by_id.get(model_id, None)
-                    if parsed is None:
-                        parsed = etree.fromstring(content)
-                        parsed_by_id[model_id] = parsed
-                    id_search = parsed.xpath(
-                        './/*[@data-type="composite-page"]/@id'
-                    )
-                    if id_search and id_search[0] == composite_page_id:
-                        return model_id
-
-        return None
+        """Get composite page uuid from the composite pages of a book"""
+
+        uuids = uuids_by_book_uuid.get(book_uuid)
+        if uuids is None:
+            uuids = uuids_by_book_uuid[book_uuid] = {}
+            for page_id, model_id in composite_pages_by_book_uuid.get(
+                book_uuid, ()
+            ):
+                uuids.setdefault(page_id, model_id)
+
+        return uuids.get(composite_page_id)
 
     def _get_composite_page_slug(book_uuid, composite_page_id):
         composite_page_uuid = _get_composite_page_uuid(
@@ -183,6 +150,13 @@ def save_linked_collection(output_path, doc):
         doc.write(f, encoding="utf-8", xml_declaration=True)
 
 
+@timed
+def save_linked_snapshot(baked_meta_dir, output_path, doc):
+    """Save a snapshot of the linked collection for disassemble, which then
+    does not need to reconstitute it. The pages are moved out of ``doc``."""
+    save_snapshot(baked_meta_dir, output_path, reconstitute_tree(doc))
+
+
 @timed
 def transform_rex_links(
     doc, slug_by_uuid, page_slug_resolver, composite_page_slug_resolver
@@ -259,9 +233,9 @@ def transform_rex_links(
 def transform_links(
         baked_content_dir, baked_meta_dir, source_book_slug, output_path, version, mock_otherbook):
     doc = load_baked_collection(baked_content_dir, source_book_slug)
-    binders = parse_collection_binders(baked_content_dir)
-    canonical_map = create_canonical_map(binders)
-    book_metadata = parse_book_metadata(binders, baked_meta_dir)
+    link_index = load_link_index(baked_content_dir, baked_meta_dir)
+    canonical_map = link_index.canonical_map
+    book_metadata = link_index.book_metadata
 
     uuid_by_slug = {entry["slug"]: entry["id"] for entry in book_metadata}
     slug_by_uuid = dict(zip(*list(zip(*uuid_by_slug.items()))[::-1]))
@@ -272,9 +246,8 @@ def transform_links(
     page_slug_resolver = gen_page_slug_resolver(
         book_tree_by_uuid
     )
-    binders_by_book_uuid = {binder.id: binder for binder in binders}
     composite_page_slug_resolver = gen_composite_page_slug_resolver(
-        binders_by_book_uuid, page_slug_resolver,
+        link_index.composite_pages_by_book_uuid, page_slug_resolver,
     )
     transform_rex_links(
         doc, slug_by_uuid, page_slug_resolver, composite_page_slug_resolver
@@ -314,6 +287,7 @@ def transform_links(
                    canonical_book_slug, page_slug, version)
 
     save_linked_collection(output_path, doc)
+    save_linked_snapshot(baked_meta_dir, output_path, doc)
 
 
 @timed
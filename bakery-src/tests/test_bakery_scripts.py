@@ -46,10 +46,12 @@ from bakery_scripts import (
     copy_resources_s3,
     fetch_map_resources,
     link_single,
+    link_index,
     patch_same_book_links,
     link_rex,
     utils,
     html_parser,
+    binder_snapshot,
     cnx_models,
     profiler,
     pptify_book,
@@ -468,6 +470,61 @@ def test_disassemble_book_empty_baked_metadata(tmp_path, mocker):
     assert m42092_data["id"] == f"11111111{mock_uuid}"
 
 
+def test_disassemble_book_from_snapshot(tmp_path, mocker):
+    """Test disassemble_book uses a snapshot of the linked book, like the one
+    link_single saves, instead of reconstituting it
+    """
+    input_dir = tmp_path / "book"
+    input_dir.mkdir()
+    input_xhtml_file = input_dir / "collection.linked.xhtml"
+    input_xhtml_file.write_bytes(
+        Path(TEST_DATA_DIR, "collection.baked.xhtml").read_bytes()
+    )
+    input_metadata_file = input_dir / "collection.baked-metadata.json"
+    input_metadata_file.write_bytes(
+        Path(TEST_DATA_DIR, "collection.baked-metadata.json").read_bytes()
+    )
+
+    def disassemble(output_dir):
+        output_dir.mkdir()
+        mocker.patch(
+            "sys.argv",
+            [
+                "",
+                str(input_xhtml_file),
+                str(input_metadata_file),
+                "collection",
+                str(output_dir),
+            ],
+        )
+        disassemble_book.main()
+        return {
+            path.name: path.read_bytes() for path in output_dir.iterdir()
+        }
+
+    expected = disassemble(tmp_path / "reconstituted")
+
+    link_single.save_linked_snapshot(
+        input_dir, input_xhtml_file, etree.parse(str(input_xhtml_file))
+    )
+    reconstitute_tree = mocker.spy(disassemble_book, "reconstitute_tree")
+    outputs = disassemble(tmp_path / "snapshot")
+    assert reconstitute_tree.call_count == 0
+
+    assert outputs.keys() == expected.keys()
+    assert len(outputs) == 6
+    for name, content in outputs.items():
+        if name.endswith("-metadata.json"):
+            data = json.loads(content)
+            expected_data = json.loads(expected[name])
+            # Pages without a revised date are stamped with the current time
+            data.pop("revised", None)
+            expected_data.pop("revised", None)
+            assert data == expected_data, name
+        else:
+            assert content == expected[name], name
+
+
 def test_canonical_list_order():
     """Test if legacy ordering of canonical books is preserved"""
     canonical_list = os.path.join(SCRIPT_DIR, "canonical-book-list.json")
@@ -1051,6 +1108,73 @@ def test_assemble_book_metadata_empty_revised_json(tmp_path, mocker):
     )
 
 
+def test_reconstitute_tree():
+    """Test reconstituting an already parsed tree gives the same models"""
+    input_baked_xhtml = os.path.join(TEST_DATA_DIR, "collection.baked.xhtml")
+
+    with open(input_baked_xhtml, "r") as baked_xhtml:
+        expected = html_parser.reconstitute(baked_xhtml)
+        baked_xhtml.seek(0)
+        tree = etree.parse(baked_xhtml)
+    binder = html_parser.reconstitute_tree(tree)
+
+    assert binder.ident_hash == expected.ident_hash
+    assert utils.model_to_tree(binder) == utils.model_to_tree(expected)
+    docs = list(cnx_models.flatten_to_documents(binder))
+    expected_docs = list(cnx_models.flatten_to_documents(expected))
+    assert len(docs) == len(expected_docs) > 0
+    for doc, expected_doc in zip(docs, expected_docs):
+        assert doc.ident_hash == expected_doc.ident_hash
+        assert doc.metadata == expected_doc.metadata
+        assert doc.content == expected_doc.content
+    # The pages were moved into the documents, the navigation was not
+    assert not tree.xpath('//*[@data-type="page"]')
+    assert tree.xpath(
+        "//xhtml:nav", namespaces=html_parser.HTML_DOCUMENT_NAMESPACES
+    )
+
+
+def test_binder_snapshot(tmp_path):
+    """Test a binder loaded from a snapshot matches the reconstituted one"""
+    input_baked_xhtml = tmp_path / "collection.baked.xhtml"
+    input_baked_xhtml.write_bytes(
+        Path(TEST_DATA_DIR, "collection.baked.xhtml").read_bytes()
+    )
+    assert binder_snapshot.load_snapshot(tmp_path, input_baked_xhtml) is None
+
+    with open(input_baked_xhtml, "r") as baked_xhtml:
+        expected = html_parser.reconstitute(baked_xhtml)
+    expected_tree = utils.model_to_tree(expected)
+    binder_snapshot.save_snapshot(
+        tmp_path, input_baked_xhtml, expected, {"slug": "collection"}
+    )
+
+    snapshot = binder_snapshot.load_snapshot(tmp_path, input_baked_xhtml)
+    assert snapshot.metadata == {"slug": "collection"}
+    assert snapshot.tree == expected_tree
+    binder = snapshot.binder
+    assert binder.ident_hash == expected.ident_hash
+    assert utils.model_to_tree(binder) == expected_tree
+    docs = list(cnx_models.flatten_to_documents(binder))
+    expected_docs = list(cnx_models.flatten_to_documents(expected))
+    assert len(docs) == len(expected_docs) > 0
+    for doc, expected_doc in zip(docs, expected_docs):
+        assert type(doc) is type(expected_doc)
+        assert doc.ident_hash == expected_doc.ident_hash
+        assert doc.metadata == expected_doc.metadata
+        assert doc.content == expected_doc.content
+        assert etree.tostring(doc.tree) == expected_doc.content
+
+    # Stale once the XHTML changes
+    with open(input_baked_xhtml, "a") as baked_xhtml:
+        baked_xhtml.write("\n")
+    assert binder_snapshot.load_snapshot(tmp_path, input_baked_xhtml) is None
+    assert (
+        binder_snapshot.load_binder(tmp_path, input_baked_xhtml).ident_hash ==
+        expected.ident_hash
+    )
+
+
 def test_bake_book_metadata(tmp_path, mocker):
     """Test bake_book_metadata script"""
     input_raw_metadata = os.path.join(
@@ -1083,6 +1207,13 @@ def test_bake_book_metadata(tmp_path, mocker):
     baked_metadata = json.loads(output_baked_book_metadata.read_text())
     book_metadata = baked_metadata[book_ident_hash]
 
+    # Running again loads the binder snapshot saved by the first run
+    assert binder_snapshot.load_snapshot(tmp_path, input_baked_xhtml)
+    reconstitute = mocker.spy(bake_book_metadata, "reconstitute_tree")
+    bake_book_metadata.main()
+    assert reconstitute.call_count == 0
+    assert json.loads(output_baked_book_metadata.read_text()) == baked_metadata
+
     assert isinstance(book_metadata["tree"], dict) is True
     assert "contents" in book_metadata["tree"].keys()
     assert "license" in book_metadata.keys()
@@ -3462,6 +3593,25 @@ def test_link_single(tmp_path, mocker):
     )
     link_single.main()
 
+    # The books are indexed once for every run of link-single
+    linked = linked_xhtml.read_bytes()
+    assert (baked_meta_dir / link_index.LINK_INDEX_FILENAME).exists()
+    index_book = mocker.spy(link_index, "index_book")
+    link_single.main()
+    assert index_book.call_count == 0
+    assert linked_xhtml.read_bytes() == linked
+
+    # The linked book is snapshotted for disassemble
+    snapshot = binder_snapshot.load_snapshot(baked_meta_dir, linked_xhtml)
+    with open(linked_xhtml, "r") as linked_file:
+        expected_binder = html_parser.reconstitute(linked_file)
+    assert snapshot.tree == utils.model_to_tree(expected_binder)
+    docs = list(cnx_models.flatten_to_documents(snapshot.binder))
+    expected_docs = list(cnx_models.flatten_to_documents(expected_binder))
+    assert len(docs) == len(expected_docs) > 0
+    for doc, expected_doc in zip(docs, expected_docs):
+        assert doc.content == expected_doc.content
+
     expected_links = [
         [
             ("id", "l1"),
@@ -3557,6 +3707,136 @@ def test_link_single(tmp_path, mocker):
     assert check_links == expected_links
 
 
+def test_link_index(tmp_path, mocker):
+    """Test the link index only reindexes books whose baked XHTML or baked
+    metadata changed, and drops books that were removed
+    """
+    baked_dir = tmp_path / "baked-book-group"
+    baked_dir.mkdir()
+    baked_meta_dir = tmp_path / "baked-book-metadata-group"
+    baked_meta_dir.mkdir()
+    book1_uuid = "1ba7e813-2d8a-4b73-87a1-876cfb5e7b58"
+    book2_uuid = "3c321f43-1da5-4c7b-91d1-abca2dd8ab8f"
+
+    def write_baked(slug, book_uuid, page_uuid, canonical_book_uuid):
+        (baked_dir / f"{slug}.baked.xhtml").write_text(f"""
+            <html xmlns="http://www.w3.org/1999/xhtml">
+            <body>
+            <div data-type="metadata" style="display: none;">
+            <h1 data-type="document-title" itemprop="name">{slug}</h1>
+            <span data-type="slug" data-value="{slug}"></span>
+            <span data-type="cnx-archive-uri"
+                data-value="{book_uuid}@version"></span>
+            </div>
+            <nav id="toc">
+            <ol><li cnx-archive-uri="{page_uuid}@"><a href="">Page</a></li></ol>
+            </nav>
+            <div data-type="page" id="{page_uuid}">
+            <div data-type="metadata" style="display: none;">
+            <h1 data-type="document-title" itemprop="name">Page</h1>
+            <span data-type="canonical-book-uuid"
+                data-value="{canonical_book_uuid}"/>
+            </div>
+            </div>
+            </body>
+            </html>
+        """)
+
+    def write_baked_meta(slug, book_uuid, page_slug):
+        (baked_meta_dir / f"{slug}.baked-metadata.json").write_text(
+            json.dumps({
+                f"{book_uuid}@version": {
+                    "id": book_uuid,
+                    "slug": slug,
+                    "tree": {"id": f"{book_uuid}@version", "slug": page_slug},
+                }
+            })
+        )
+
+    write_baked("book1", book1_uuid, "page1", book1_uuid)
+    write_baked_meta("book1", book1_uuid, "book1")
+    write_baked("book2", book2_uuid, "page2", book2_uuid)
+    write_baked_meta("book2", book2_uuid, "book2")
+    index = link_index.load_link_index(baked_dir, baked_meta_dir)
+    assert index.canonical_map == {"page1": book1_uuid, "page2": book2_uuid}
+
+    index_book = mocker.spy(link_index, "index_book")
+
+    def reindexed():
+        index_book.reset_mock()
+        index = link_index.load_link_index(baked_dir, baked_meta_dir)
+        return index, [Path(args[0]).name for args, _ in index_book.call_args_list]
+
+    # WHEN: Nothing changed
+    index, names = reindexed()
+    # THEN: No book is read again
+    assert names == []
+
+    # WHEN: The baked XHTML of a book changes
+    write_baked("book1", book1_uuid, "page1", book2_uuid)
+    index, names = reindexed()
+    # THEN: Only that book is indexed again
+    assert names == ["book1.baked.xhtml"]
+    assert index.canonical_map == {"page1": book2_uuid, "page2": book2_uuid}
+
+    # WHEN: The baked metadata of a book changes
+    book2 = link_index.index_book(baked_dir / "book2.baked.xhtml", baked_meta_dir)
+    assert link_index._is_current(book2, baked_dir / "book2.baked.xhtml")
+    write_baked_meta("book2", book2_uuid, "book2-changed")
+    assert not link_index._is_current(book2, baked_dir / "book2.baked.xhtml")
+    index, names = reindexed()
+    # THEN: Only that book is indexed again
+    assert names == ["book2.baked.xhtml"]
+    assert sorted(
+        metadata["tree"]["slug"] for metadata in index.book_metadata
+    ) == ["book1", "book2-changed"]
+
+    # WHEN: The baked XHTML of a book is removed
+    (baked_dir / "book1.baked.xhtml").unlink()
+    index, names = reindexed()
+    # THEN: The book is dropped from the saved index without reading others
+    assert names == []
+    assert index.canonical_map == {"page2": book2_uuid}
+    saved = json.loads(
+        (baked_meta_dir / link_index.LINK_INDEX_FILENAME).read_text()
+    )
+    assert list(saved["books"]) == ["book2.baked.xhtml"]
+
+
+def test_link_single_resolvers():
+    """Test the page slug and composite page slug lookups"""
+    book_tree_by_uuid = {
+        "book": {
+            "id": "book@1",
+            "slug": "book",
+            "contents": [
+                {"id": "page1@", "slug": "page1-slug"},
+                {"id": "page2-longer@", "slug": "page2-slug"},
+                {"id": "page1@", "slug": "page1-duplicate-slug"},
+                {"id": "composite1@", "slug": "composite1-slug"},
+            ],
+        }
+    }
+    page_slug_resolver = link_single.gen_page_slug_resolver(book_tree_by_uuid)
+    assert page_slug_resolver("book", "page1") == "page1-slug"
+    # Ids are matched by prefix
+    assert page_slug_resolver("book", "page2") == "page2-slug"
+    assert page_slug_resolver("book", "missing") is None
+
+    composite_page_slug_resolver = link_single.gen_composite_page_slug_resolver(
+        {
+            "book": [
+                ["composite-page-1", "composite1"],
+                ["composite-page-1", "page1"],
+            ]
+        },
+        page_slug_resolver,
+    )
+    assert composite_page_slug_resolver("book", "composite-page-1") == "composite1-slug"
+    assert composite_page_slug_resolver("book", "composite-page-2") is None
+    assert composite_page_slug_resolver("other", "composite-page-1") is None
+
+
 def test_link_single_with_flag(tmp_path, mocker):
     """Test link-single script"""
     baked_dir = tmp_path / "baked-book-group"
@@ -4261,6 +4541,36 @@ class ModelBehaviorTestCase(unittest.TestCase):
         ]
         self.assertEqual(expected_uris, [r.uri for r in document.references])
 
+    def test_document_tree(self):
+        body = cnx_models.content_to_etree(
+            '<body xmlns="http://www.w3.org/1999/xhtml"><p>Fin.</p></body>'
+        )
+        document = cnx_models.Document("document", body)
+        content = document.content
+        self.assertTrue(b"<p>Fin.</p>" in content)
+        # Serialized once until the tree is handed out again
+        self.assertIs(content, document.content)
+
+        document.tree[0].set("id", "fin")
+        self.assertTrue(b'<p id="fin">Fin.</p>' in document.content)
+        self.assertEqual(len(document.references), 0)
+
+    def test_document_reference_changes_after_reading_content(self):
+        document = cnx_models.Document(
+            "document",
+            '<body><a href="/contents/original">link</a><img src="a.png"/></body>',
+        )
+        references = document.references
+        self.assertTrue(b'href="/contents/original"' in document.content)
+
+        references[0].uri = "/contents/changed"
+        self.assertTrue(b'href="/contents/changed"' in document.content)
+
+        resource = mock.Mock()
+        resource.id = "b.png"
+        references[1].bind(resource, "/resources/{}")
+        self.assertTrue(b'src="/resources/b.png"' in document.content)
+
     def test_document_content(self):
         with open(
             os.path.join(
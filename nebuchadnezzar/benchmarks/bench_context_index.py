@@ -0,0 +1,74 @@
+"""Compare exercise context resolution with tree searches against the id
+index on a synthetic assembled book.
+
+    PYTHONPATH=. python benchmarks/bench_context_index.py \
+        [--pages 500] [--exercises 10]
+"""
+import argparse
+from timeit import default_timer as timer
+
+from lxml import etree
+
+from nebu.formatters import IdIndex, get_context_ref, parse_context_tags
+
+
+XHTML = "http://www.w3.org/1999/xhtml"
+
+
+def make_book(pages, exercises_per_page):
+    root = etree.Element(f"{{{XHTML}}}html", nsmap={None: XHTML})
+    body = etree.SubElement(root, f"{{{XHTML}}}body")
+    links = []
+    for i in range(pages):
+        uuid = f"page{i:05}"
+        page = etree.SubElement(
+            body,
+            f"{{{XHTML}}}div",
+            {"data-type": "page", "id": f"page_{uuid}"},
+        )
+        for j in range(20):
+            etree.SubElement(
+                page, f"{{{XHTML}}}p", {"id": get_context_ref(uuid, f"p{j}")}
+            )
+        for j in range(exercises_per_page):
+            links.append((uuid, etree.SubElement(
+                page, f"{{{XHTML}}}a", {"href": f"#ost/api/ex/{i}-{j}"}
+            )))
+    return root, links
+
+
+def search_tree(root, links):
+    # What context resolution did before the index: one search of the page
+    # and one search of the book for every exercise
+    for uuid, elem in links:
+        parent_page = elem.xpath('ancestor::*[@data-type="page"]')[0]
+        ref = get_context_ref(uuid, "p0")
+        assert parent_page.find(f'.//*[@id="{ref}"]') is not None
+        assert root.find(f'.//*[@id="{ref}"]') is not None
+
+
+def use_index(root, links):
+    id_index = IdIndex(root)
+    page_uuids = set(uuid for uuid, _ in links)
+    for uuid, elem in links:
+        tags = [f"context-cnxmod:{uuid}", "context-cnxfeature:p0"]
+        context = parse_context_tags(tags, elem, page_uuids, id_index)
+        assert id_index.get(get_context_ref(*context)) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--exercises", type=int, default=10)
+    args = parser.parse_args()
+
+    root, links = make_book(args.pages, args.exercises)
+    print(f"{len(links)} exercises in {args.pages} pages")
+    for name, fn in (("tree search", search_tree), ("id index", use_index)):
+        start = timer()
+        fn(root, links)
+        print(f"{name}: {timer() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure how long importing the CLI takes with ``python -X importtime``
+and list the slowest imports. Exits with an error when the import takes
+longer than ``--max-ms``, so it can be used as a gate.
+
+    PYTHONPATH=. python benchmarks/bench_import_time.py [--max-ms 400]
+"""
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module):
+    """Cumulative import time in microseconds of every module imported by
+    importing ``module`` in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="nebu.cli.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[args.module])
+    total_ms = best[args.module] / 1000
+    print(f"import {args.module}: {total_ms:.1f}ms (best of {args.repeat})")
+    slowest = sorted(
+        (
+            (us, name) for name, us in best.items()
+            if name != args.module and (
+                name.startswith("nebu") or "." not in name
+            )
+        ),
+        reverse=True,
+    )
+    for us, name in slowest[:args.top]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        sys.exit(f"Importing {args.module} took longer than {args.max_ms}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Compare parse_metadata with the xpath query per property it replaced on
+the modules and collections in the test data.
+
+    PYTHONPATH=. python benchmarks/bench_parse_metadata.py [--repeat 200]
+"""
+import argparse
+from pathlib import Path
+from timeit import default_timer as timer
+
+from nebu.parse import _parse_metadata_xpath, parse_metadata
+from nebu.xml_utils import open_xml
+
+
+DATA_DIR = Path(__file__).parent.parent / "nebu" / "tests" / "data"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    trees = [
+        open_xml(str(p))
+        for p in (
+            *DATA_DIR.glob("**/*.cnxml"),
+            *DATA_DIR.glob("**/*collection*.xml"),
+        )
+    ]
+    print(f"{len(trees)} documents, {args.repeat} times")
+    for name, fn in (
+        ("xpath queries", _parse_metadata_xpath),
+        ("single pass", parse_metadata),
+    ):
+        start = timer()
+        for _ in range(args.repeat):
+            for tree in trees:
+                fn(tree)
+        print(f"{name}: {timer() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare parsing modules that reference the MathML DTD when every parse
+loads the DTD from disk against the catalog resolver, which keeps it in
+memory.
+
+    PYTHONPATH=. python benchmarks/bench_xml_parser.py [--docs 500]
+"""
+import argparse
+from timeit import default_timer as timer
+
+from lxml import etree
+
+from nebu.xml_utils import (
+    DEFAULT_XMLPARSER,
+    XML_PARSER_OPTIONS,
+    XML_RESOLVER,
+)
+
+
+def make_doc(dtd_url):
+    paragraphs = "".join(
+        f"<para id='p{i}'>&alpha; &times; <m:math><m:mi>&beta;</m:mi>"
+        "</m:math></para>"
+        for i in range(50)
+    )
+    return (
+        '<!DOCTYPE document PUBLIC "-//W3C//DTD MathML 2.0//EN" '
+        f'"{dtd_url}">\n'
+        '<document xmlns="http://cnx.rice.edu/cnxml" '
+        'xmlns:m="http://www.w3.org/1998/Math/MathML">'
+        f"<content>{paragraphs}</content></document>"
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=500)
+    args = parser.parse_args()
+
+    dtd_path = XML_RESOLVER.by_system_id[
+        "http://www.w3.org/Math/DTD/mathml2/mathml2.dtd"
+    ]
+    # Before: the DTD is a file libxml2 loads for every document
+    uncached_doc = make_doc(f"file://{dtd_path}")
+    uncached_parser = etree.XMLParser(**XML_PARSER_OPTIONS)
+    cached_doc = make_doc("http://www.w3.org/Math/DTD/mathml2/mathml2.dtd")
+    for name, doc, xml_parser in (
+        ("dtd from disk", uncached_doc, uncached_parser),
+        ("catalog resolver", cached_doc, DEFAULT_XMLPARSER),
+    ):
+        start = timer()
+        for _ in range(args.docs):
+            etree.fromstring(doc, xml_parser)
+        elapsed = timer() - start
+        print(
+            f"{name}: {elapsed:.3f}s "
+            f"({args.docs / elapsed:.0f} docs/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+from contextlib import nullcontext
 from pathlib import Path
 import shutil
 import json
@@ -11,36 +12,54 @@ from ..models.book_part import BookPart
 from ..formatters import (
     exercise_callback_factory,
     insert_includes,
-    resolve_module_links,
-    update_ids,
+    resolve_module_links_and_update_ids,
     assemble_collection,
     interactive_callback_factory,
+    INCLUDE_THREADS,
+    IdIndex,
 )
-from ..xml_utils import fix_namespaces
-from ..utils import re_first_or_default, unknown_progress
-from ..models.book_container import BookContainer
+from ..xml_utils import fix_namespaces, write_fixed_namespaces
+from ..utils import unknown_progress
 from ..models.path_resolver import PathResolver
-from ..media_utils import get_media_metadata
+from ..models.module_index import ModuleIndex
+from ..models.interactives_index import InteractivesIndex
+from ..models.repo_manifest import load_repo_context
+from ..media_utils import MediaMetadataCache, get_media_metadata
+from ..html_cache import HTMLCache, DEFAULT_MAX_SIZE
+from ..content_store import ContentStore
+from ..exercise_cache import ExerciseCache, DEFAULT_TTL
 
 
 DEFAULT_EXERCISES_HOST = "exercises.openstax.org"
 
 
 def create_interactive_factories(
-    path_resolver: PathResolver, docs_by_id, media_handler
+    path_resolver: PathResolver,
+    docs_by_id,
+    media_handler,
+    id_index=None,
+    prefetch_media=None,
+    interactives=None,
 ):
-    h5p_media_handler = h5p_media_handler_factory(path_resolver, media_handler)
+    h5p_media_handler = h5p_media_handler_factory(
+        path_resolver, media_handler, interactives
+    )
     return [
         interactive_callback_factory(
             "{INTERACTIVES_ROOT}",
             path_resolver,
             docs_by_id,
             h5p_media_handler,
+            id_index,
+            prefetch_media,
+            interactives,
         )
     ]
 
 
-def create_exercise_factories(exercise_host, token):
+def create_exercise_factories(
+    exercise_host, token, client=None, id_index=None
+):
     exercise_match_urls = (
         (
             "#ost/api/ex/",
@@ -56,7 +75,13 @@ def create_exercise_factories(exercise_host, token):
         ),
     )
     return [
-        exercise_callback_factory(exercise_match, exercise_url, token=token)
+        exercise_callback_factory(
+            exercise_match,
+            exercise_url,
+            token=token,
+            client=client,
+            id_index=id_index,
+        )
         for exercise_match, exercise_url in exercise_match_urls
     ]
 
@@ -72,7 +97,9 @@ def to_dom_resource_path(filename):
 
 
 def media_handler_factory(
-    resource_dir: str, media_cache: dict[tuple, str] = {}
+    resource_dir: str,
+    media_cache: dict[tuple, str] = {},
+    metadata_cache: MediaMetadataCache | None = None,
 ):
     def media_handler(
         cache_key: tuple,
@@ -83,7 +110,9 @@ def media_handler_factory(
         if cached is None:
             assert resource_abs_path is not None, \
                 f"Missing resource: {cache_key}"
-            sha1, metadata = get_media_metadata(resource_abs_path, is_image)
+            sha1, metadata = get_media_metadata(
+                resource_abs_path, is_image, metadata_cache
+            )
             resource_dst = os.path.join(resource_dir, sha1)
             shutil.move(resource_abs_path, resource_dst)
             save_resource_metadata(metadata, resource_dir, sha1)
@@ -94,14 +123,19 @@ def media_handler_factory(
 
 def h5p_media_handler_factory(
     path_resolver: PathResolver,
-    media_handler: Callable[[tuple, str | None, bool], str]
+    media_handler: Callable[[tuple, str | None, bool], str],
+    interactives: InteractivesIndex | None = None,
 ):
+    find_interactives_paths = (
+        interactives.find_interactives_paths
+        if interactives is not None
+        else path_resolver.find_interactives_paths
+    )
+
     def h5p_media_handler(interactive_id, elem, uri_attrib, is_image):
         orig_path = elem.attrib[uri_attrib]
         cache_key = (interactive_id, orig_path)
-        paths = path_resolver.find_interactives_paths(
-            interactive_id, orig_path
-        )
+        paths = find_interactives_paths(interactive_id, orig_path)
         # Specifically use public path here
         maybe_abs_path = paths.get("public", None)
         elem.attrib[uri_attrib] = media_handler(
@@ -110,39 +144,66 @@ def h5p_media_handler_factory(
     return h5p_media_handler
 
 
-def collection_to_assembled_xhtml(
+def collection_to_assembled_tree(
     collection,
     docs_by_id,
     docs_by_uuid,
     path_resolver,
     token,
     exercise_host,
-    media_handler
+    media_handler,
+    exercise_client=None,
+    module_index=None,
+    media_metadata_cache=None,
 ):
-    page_uuids = list(docs_by_uuid.keys())
-    includes = [
-        *create_interactive_factories(
-            path_resolver, docs_by_id, media_handler
-        ),
-        *create_exercise_factories(exercise_host, token),
-    ]
+    page_uuids = set(docs_by_uuid.keys())
+    interactives = InteractivesIndex(path_resolver)
+    if exercise_client is None:
+        from ..exercise_client import ExerciseClient
+
+        exercise_client = ExerciseClient(token, pool_size=INCLUDE_THREADS)
     # Use docs_by_uuid.values to ensure each document is only used one time
     with unknown_progress("Resolving document references"):
         for document in docs_by_uuid.values():
-            # Step 1: Rewrite module links
-            resolve_module_links(document, docs_by_id, path_resolver)
-            # Step 2: Update ids and links
-            update_ids(document)
+            # Rewrite module links, then update ids and the links to them
+            resolve_module_links_and_update_ids(
+                document, docs_by_id, path_resolver, module_index
+            )
+            document.release_content()
 
     with unknown_progress("Combining documents"):
         # Combine all the pieces together into the final assembled document
         assembled_collection = assemble_collection(collection)
+        id_index = IdIndex(assembled_collection)
 
+    includes = [
+        *create_interactive_factories(
+            path_resolver,
+            docs_by_id,
+            media_handler,
+            id_index,
+            (
+                media_metadata_cache.prefetch
+                if media_metadata_cache is not None
+                else None
+            ),
+            interactives,
+        ),
+        *create_exercise_factories(
+            exercise_host, token, exercise_client, id_index
+        ),
+    ]
     with unknown_progress("Fetching and inserting exercises"):
         # Finally, fetch and insert any includes from remote sources
         insert_includes(assembled_collection, page_uuids, includes)
+        exercise_client.log_stats()
+        interactives.log_stats()
 
-    return fix_namespaces(assembled_collection)
+    return assembled_collection
+
+
+def collection_to_assembled_xhtml(*args, **kwargs):
+    return fix_namespaces(collection_to_assembled_tree(*args, **kwargs))
 
 
 @click.command(name="assemble")
@@ -158,6 +219,63 @@ def collection_to_assembled_xhtml(
     default=DEFAULT_EXERCISES_HOST,
     help="Default {}".format(DEFAULT_EXERCISES_HOST),
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to convert modules (Default 1)",
+)
+@click.option(
+    "--html-cache-dir",
+    type=click.Path(file_okay=False),
+    help="Reuse module html converted by previous runs from this directory",
+)
+@click.option(
+    "--html-cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_SIZE >> 20,
+    help="Maximum size of the html cache in MiB (Default {})".format(
+        DEFAULT_MAX_SIZE >> 20
+    ),
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Write the assembled xhtml one top-level element at a time",
+)
+@click.option(
+    "--exercise-cache-dir",
+    type=click.Path(file_okay=False),
+    help="Reuse exercises fetched by previous runs from this directory",
+)
+@click.option(
+    "--exercise-cache-ttl",
+    type=click.IntRange(min=0),
+    default=DEFAULT_TTL,
+    help="Seconds before cached exercises are revalidated (Default {})".format(
+        DEFAULT_TTL
+    ),
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Only use cached exercises and fail on exercises that are missing",
+)
+@click.option(
+    "--media-cache-dir",
+    type=click.Path(file_okay=False),
+    help="Reuse media checksums computed by previous runs from this directory",
+)
+@click.option(
+    "--content-memory",
+    type=click.IntRange(min=0),
+    default=None,
+    help=(
+        "Keep the content of pages compressed, using at most this many MiB "
+        "of memory before writing it to temporary files"
+    ),
+)
 @click.pass_context
 def assemble(
     ctx,
@@ -165,7 +283,16 @@ def assemble(
     output_dir,
     resource_dir,
     exercise_token,
-    exercise_host
+    exercise_host,
+    jobs,
+    html_cache_dir,
+    html_cache_size,
+    stream,
+    exercise_cache_dir,
+    exercise_cache_ttl,
+    offline,
+    content_memory,
+    media_cache_dir,
 ):
     """Assembles litezip structure data into a single-page-html file.
 
@@ -173,18 +300,35 @@ def assemble(
     assembled single-page-html.
 
     """
-    books_xml = Path(input_dir) / "META-INF" / "books.xml"
-    container = BookContainer.from_str(books_xml.read_bytes(), input_dir)
-    path_resolver = PathResolver(
-        container,
-        lambda container: Path(container.pages_root).glob("**/*.cnxml"),
-        lambda s: re_first_or_default(r'm[0-9]+', s),
-    )
+    if offline and exercise_cache_dir is None:
+        raise click.UsageError("--offline requires --exercise-cache-dir")
+    container, path_resolver = load_repo_context(input_dir)
     output_dir = Path(output_dir)
     if not output_dir.exists():
         output_dir.mkdir()
 
-    media_handler = media_handler_factory(resource_dir)
+    media_metadata_cache = MediaMetadataCache(media_cache_dir)
+    media_handler = media_handler_factory(
+        resource_dir, metadata_cache=media_metadata_cache
+    )
+    html_cache = (
+        HTMLCache(html_cache_dir, html_cache_size << 20)
+        if html_cache_dir is not None
+        else None
+    )
+    from ..exercise_client import ExerciseClient
+
+    exercise_client = ExerciseClient(
+        exercise_token,
+        pool_size=INCLUDE_THREADS,
+        cache=(
+            ExerciseCache(exercise_cache_dir, exercise_cache_ttl)
+            if exercise_cache_dir is not None
+            else None
+        ),
+        offline=offline,
+    )
+    module_index = ModuleIndex.from_dir(input_dir)
 
     for book in container.books:
         output_assembled_xhtml = output_dir / f"{book.slug}.assembled.xhtml"
@@ -192,15 +336,25 @@ def assemble(
         assert not output_assembled_xhtml.exists(), \
             f'File "{output_assembled_xhtml}" already exists.'
 
-        with unknown_progress(f"Assembling {book.slug}"):
+        content_store = (
+            ContentStore(content_memory << 20)
+            if content_memory is not None
+            else None
+        )
+        with unknown_progress(f"Assembling {book.slug}"), \
+                content_store or nullcontext():
             (
                 collection,
                 docs_by_id,
                 docs_by_uuid,
             ) = BookPart.collection_from_file(
-                path_resolver.get_collection_path(book.slug), path_resolver
+                path_resolver.get_collection_path(book.slug),
+                path_resolver,
+                jobs=jobs,
+                html_cache=html_cache,
+                content_store=content_store,
             )
-            assembled_xhtml = collection_to_assembled_xhtml(
+            args = (
                 collection,
                 docs_by_id,
                 docs_by_uuid,
@@ -208,7 +362,23 @@ def assemble(
                 exercise_token,
                 exercise_host,
                 media_handler,
+                exercise_client,
+                module_index,
+                media_metadata_cache,
             )
-            output_assembled_xhtml.write_bytes(assembled_xhtml)
+            if stream:
+                write_fixed_namespaces(
+                    collection_to_assembled_tree(*args),
+                    str(output_assembled_xhtml),
+                )
+            else:
+                assembled_xhtml = collection_to_assembled_xhtml(*args)
+                output_assembled_xhtml.write_bytes(assembled_xhtml)
+
+    module_index.save()
+    media_metadata_cache.save()
+    media_metadata_cache.log_stats()
+    if html_cache is not None:
+        html_cache.log_stats()
 
     return 0
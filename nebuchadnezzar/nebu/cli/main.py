@@ -1,7 +1,6 @@
 """Commandline utility for publishing content"""
 import click
 import sys
-import requests
 import re
 from collections import defaultdict
 
@@ -32,6 +31,8 @@ def get_remote_releases(json_url, json_path):
     """Get list of releases from remote json file, sorted from oldest
     to newest. If a network error occurs, returns an empty list.
     """
+    import requests
+
     try:
         json = requests.get(json_url).json()
     except requests.exceptions.RequestException:
@@ -7,20 +7,35 @@ from ._common import common_params
 from ..utils import re_first_or_default
 from ..models.book_container import BookContainer
 from ..models.path_resolver import PathResolver
+from ..models.repo_manifest import REPO_MANIFEST_FILENAME, RepoManifest
 
 
 
 @click.command(name="parse-repo")
 @common_params
 @click.argument("input-dir", type=click.Path(exists=True))
-def parse_repo(input_dir):
-    books_xml = Path(input_dir) / "META-INF" / "books.xml"
-    container = BookContainer.from_str(books_xml.read_bytes(), input_dir)
-    path_resolver = PathResolver(
-        container,
-        lambda container: Path(container.pages_root).glob("**/*.cnxml"),
-        lambda s: re_first_or_default(r"m[0-9]+", s),
-    )
+@click.option(
+    "--manifest",
+    is_flag=True,
+    help=(
+        f"Save the result to {REPO_MANIFEST_FILENAME} in INPUT_DIR so that "
+        "pre-assemble and assemble do not need to search the repository"
+    ),
+)
+def parse_repo(input_dir, manifest):
+    if manifest:
+        repo_manifest = RepoManifest.from_dir(input_dir)
+        repo_manifest.save()
+        container = repo_manifest.container
+        path_resolver = repo_manifest.get_path_resolver()
+    else:
+        books_xml = Path(input_dir) / "META-INF" / "books.xml"
+        container = BookContainer.from_str(books_xml.read_bytes(), input_dir)
+        path_resolver = PathResolver(
+            container,
+            lambda container: Path(container.pages_root).glob("**/*.cnxml"),
+            lambda s: re_first_or_default(r"m[0-9]+", s),
+        )
     combined = {
         "container": container,
         "modules": path_resolver.module_paths_by_id,
@@ -1,9 +1,10 @@
 """Inject / modify metadata for book CNXML from git"""
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 import json
 from pathlib import Path
-from datetime import timezone
+from datetime import datetime, timezone
 import re
 from typing import Optional
 import os
@@ -13,14 +14,15 @@ import uuid
 import click
 from lxml import etree
 from lxml.builder import ElementMaker
-from git import Repo
 from slugify import slugify
 
 from ._common import common_params
-from ..utils import re_first_or_default, unknown_progress
+from ..utils import unknown_progress
 from ..models.book_container import CONTAINER_NSMAP, Book, BookContainer
 from ..models.path_resolver import PathResolver
-from ..models.book_part import BookPart
+from ..models.book_part import BookPart, PartType
+from ..models.module_index import ModuleIndex
+from ..models.repo_manifest import load_repo_context
 from ..parse import NSMAP as CNXML_NSMAP, parse_metadata
 from ..xml_utils import Elementish, etree_to_str, open_xml
 
@@ -55,11 +57,9 @@ def add_metadata_entries(xml_doc, new_metadata, md_namespace):
         metadata.append(element)
 
 
-def fetch_update_metadata(
-    path_resolver,
-    canonical_mapping,
-    git_repo,
-):
+def get_git_metadata(git_repo):
+    from git import Repo
+
     repo = Repo(git_repo)
 
     # For the time being, we're going to parse the timestamp of the HEAD
@@ -69,37 +69,51 @@ def fetch_update_metadata(
         timezone.utc
     ).isoformat()
     book_version = str(commit.hexsha)[0:GIT_SHA_PREFIX_LEN]
+    return revised_time, book_version
 
-    module_ids_by_path = {
-        v: k for k, v in path_resolver.module_paths_by_id.items()
-    }
 
-    # Get list of module files while filtering orphans using canonical_mapping
-    module_files = [
-        module_file
-        for module_id, module_file in path_resolver.module_paths_by_id.items()
-        if module_id in canonical_mapping
-    ]
-
-    collection_files = list(path_resolver.collection_paths_by_book.values())
+def get_module_revised_times(git_repo, module_files):
+    """Get the time of the last commit that changed each module from one
+    walk of the history, which stops once every module has been seen.
+    Modules that are not in the history are left out."""
+    from git import Repo
 
+    repo = Repo(git_repo)
+    work_tree = Path(repo.working_tree_dir).resolve()
+    remaining = {}
     for module_file in module_files:
-        cnxml_doc = open_xml(module_file)
-
-        check_for_existing_metadata(
-            cnxml_doc, ["revised", "canonical-book-uuid"], module_file
-        )
+        path = Path(module_file).resolve()
+        if path.is_relative_to(work_tree):
+            remaining[path.relative_to(work_tree).as_posix()] = module_file
+    revised_times = {}
+    if not remaining:
+        return revised_times
+    proc = repo.git(c="core.quotePath=off").log(
+        "--format=%x00%ct", "--name-only", "--no-renames", as_process=True
+    )
+    try:
+        revised_time = None
+        for line in proc.stdout:
+            line = os.fsdecode(line.rstrip(b"\n"))
+            if line.startswith("\0"):
+                revised_time = datetime.fromtimestamp(
+                    int(line[1:]), timezone.utc
+                ).isoformat()
+            elif line in remaining:
+                revised_times[remaining.pop(line)] = revised_time
+                if not remaining:
+                    break
+        else:
+            # Raises if git failed
+            proc.wait()
+    finally:
+        proc.proc.kill()
+        proc.proc.wait()
+    return revised_times
 
-        new_metadata = {
-            "revised": revised_time,
-            "canonical-book-uuid": canonical_mapping[
-                module_ids_by_path[module_file]
-            ],
-        }
-        add_metadata_entries(cnxml_doc, new_metadata, NS_CNXML)
 
-        with open(module_file, "wb") as f:
-            cnxml_doc.write(f, encoding="utf-8", xml_declaration=False)
+def update_collection_metadata(path_resolver, revised_time, book_version):
+    collection_files = list(path_resolver.collection_paths_by_book.values())
 
     for collection_file in collection_files:
         collection_doc = open_xml(collection_file)
@@ -113,8 +127,7 @@ def fetch_update_metadata(
             collection_doc.write(f, encoding="utf-8", xml_declaration=False)
 
 
-def patch_paths(container, path_resolver, canonical_mapping):
-    media_dir_name = os.path.basename(container.media_root)
+def _get_src_queries():
     base_src_query = (
         "//c:{tag_name}[@src]["
         '   not(starts-with(@src, "http://") or starts-with(@src, "https://"))'
@@ -129,31 +142,79 @@ def patch_paths(container, path_resolver, canonical_mapping):
             base_src_query.format(tag_name="object"),
         )
     )
+    return ((src_query, "src"), (res_query, "resource"))
+
+
+def patch_module_paths(cnxml_doc, module_file, media_root):
+    media_dir_name = os.path.basename(media_root)
+    for query, attr_name in _get_src_queries():
+        for node in cnxml_doc.xpath(query, namespaces=CNXML_NSMAP):
+            src = node.attrib[attr_name]
+            parts = Path(src).parts
+            if media_dir_name not in parts:
+                logger.info(f"Skipping {src}")
+                continue
+            media_dir_name_idx = parts.index(media_dir_name) + 1
+            new_src = os.path.relpath(
+                os.path.join(
+                    media_root,
+                    *parts[media_dir_name_idx:],
+                ),
+                os.path.dirname(module_file),
+            )
+            if new_src != src:
+                logger.info(f'Patching src "{src}" -> "{new_src}"')
+                node.attrib[attr_name] = new_src
+
+
+def update_module(module_file, new_metadata, media_root):
+    """Add metadata to a module and patch its resource paths, reading and
+    writing the module once"""
+    cnxml_doc = open_xml(module_file)
+    check_for_existing_metadata(cnxml_doc, list(new_metadata), module_file)
+    add_metadata_entries(cnxml_doc, new_metadata, NS_CNXML)
+    # NOTE: For now we are patching image links incase modules are moved up
+    #       a directory and their links are not updated to match the new
+    #       path. Hopefully this is temporary.
+    patch_module_paths(cnxml_doc, module_file, media_root)
+    with open(module_file, "wb") as f:
+        cnxml_doc.write(f, encoding="utf-8", xml_declaration=False)
 
-    for module_id, module_file in path_resolver.module_paths_by_id.items():
-        if module_id not in canonical_mapping:
-            continue
-        cnxml_doc = open_xml(module_file)
-        for query, attr_name in ((src_query, "src"), (res_query, "resource")):
-            for node in cnxml_doc.xpath(query, namespaces=CNXML_NSMAP):
-                src = node.attrib[attr_name]
-                parts = Path(src).parts
-                if media_dir_name not in parts:
-                    logger.info(f"Skipping {src}")
-                    continue
-                media_dir_name_idx = parts.index(media_dir_name) + 1
-                new_src = os.path.relpath(
-                    os.path.join(
-                        container.media_root,
-                        *parts[media_dir_name_idx:],
-                    ),
-                    os.path.dirname(module_file),
-                )
-                if new_src != src:
-                    logger.info(f'Patching src "{src}" -> "{new_src}"')
-                    node.attrib[attr_name] = new_src
-        with open(module_file, "wb") as f:
-            cnxml_doc.write(f, encoding="utf-8", xml_declaration=False)
+
+def update_modules(
+    container,
+    path_resolver,
+    canonical_mapping,
+    revised_time,
+    jobs=1,
+    revised_times=None,
+):
+    """Add the revised time and canonical book uuid to the modules in
+    ``canonical_mapping`` and patch their resource paths, in one pass per
+    module over ``jobs`` processes. ``revised_times`` overrides
+    ``revised_time`` for the modules in it."""
+    revised_times = {} if revised_times is None else revised_times
+    args = [
+        (
+            module_file,
+            {
+                "revised": revised_times.get(module_file, revised_time),
+                "canonical-book-uuid": canonical_mapping[module_id],
+            },
+            container.media_root,
+        )
+        for module_id, module_file in path_resolver.module_paths_by_id.items()
+        # Filter orphans using canonical_mapping
+        if module_id in canonical_mapping
+    ]
+    if jobs <= 1:
+        for arg in args:
+            update_module(*arg)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Consume the results so errors are raised here
+        for _ in executor.map(update_module, *zip(*args)):
+            pass
 
 
 @dataclass
@@ -182,6 +243,14 @@ def looks_like_super_document(p: str):
         return b"super" in fin.read(1 << 10)
 
 
+def is_super_document(p: str):
+    """Check the class of the cnxml document element, which becomes the
+    class of the html body that ``BookPart.is_super`` looks at"""
+    for _, elem in etree.iterparse(p, events=("start",)):
+        return "super" in elem.get("class", "")
+    return False  # pragma: no cover
+
+
 def make_super_collection(super_document: SuperDocument) -> Elementish:
     module_uuid = super_document.module_uuid
     module_id = super_document.module_id
@@ -216,12 +285,7 @@ def make_super_collection(super_document: SuperDocument) -> Elementish:
 
 def get_repo_context(input_dir: str):
     books_xml = Path(input_dir) / "META-INF" / "books.xml"
-    container = BookContainer.from_str(books_xml.read_bytes(), input_dir)
-    path_resolver = PathResolver(
-        container,
-        lambda container: Path(container.pages_root).glob("**/*.cnxml"),
-        lambda s: re_first_or_default(r"m[0-9]+", s),
-    )
+    container, path_resolver = load_repo_context(input_dir)
     return container, path_resolver, books_xml
 
 
@@ -230,16 +294,16 @@ def remove_super_documents(
     path_resolver: PathResolver,
     super_documents_by_id: dict[str, BookPart],
 ):
-    query = "|".join(
-        f'//col:module[@document="{module_id}"]'
-        for module_id in super_documents_by_id.keys()
-    )
     super_documents = []
 
     for book in container.books:
         collection = path_resolver.get_collection_path(book.slug)
         col_tree = open_xml(collection)
-        super_modules = col_tree.xpath(query, namespaces={"col": NS_COLLXML})
+        super_modules = [
+            elem
+            for elem in col_tree.iter(f"{{{NS_COLLXML}}}module")
+            if elem.get("document") in super_documents_by_id
+        ]
         # Only update collection files if we need to
         if super_modules:
             collection_meta = parse_metadata(col_tree)
@@ -396,14 +460,12 @@ def handle_super_documents(
     books_xml: Path,
     super_path: Path,
 ):
+    # Only the metadata of super documents is used, so there is no need to
+    # convert them to html
     super_documents_by_id = {
-        module_id: doc
-        for module_id, doc in (
-            (module_id, BookPart.doc_from_file(path))
-            for module_id, path in path_resolver.module_paths_by_id.items()
-            if looks_like_super_document(path)
-        )
-        if doc.is_super
+        module_id: BookPart(PartType.DOCUMENT, parse_metadata(open_xml(path)))
+        for module_id, path in path_resolver.module_paths_by_id.items()
+        if looks_like_super_document(path) and is_super_document(path)
     }
 
     # Step 0: Run away if there are no super documents to handle
@@ -437,7 +499,22 @@ def handle_super_documents(
 @click.argument("input-dir", type=click.Path(exists=True))
 @click.option("--repo-dir", default=None, type=Optional[str])
 @click.option("--super-dir", default=None, type=Optional[str])
-def pre_assemble(input_dir, repo_dir, super_dir):
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to update modules (Default 1)",
+)
+@click.option(
+    "--per-module-revised",
+    is_flag=True,
+    help=(
+        "Use the last commit that changed each module as its revised time "
+        "instead of the HEAD commit"
+    ),
+)
+def pre_assemble(input_dir, repo_dir, super_dir, jobs, per_module_revised):
     """Prepares litezip structure data for single-page-html file conversion."""
 
     canonical_mapping = {}
@@ -469,15 +546,29 @@ def pre_assemble(input_dir, repo_dir, super_dir):
         if repo_dir is not None
         else input_dir
     )
-    with unknown_progress("Updating metadata"):
-        fetch_update_metadata(
+    revised_time, book_version = get_git_metadata(git_repo)
+    revised_times = None
+    if per_module_revised:
+        with unknown_progress("Reading module history"):
+            revised_times = get_module_revised_times(
+                git_repo, path_resolver.module_paths_by_id.values()
+            )
+    with unknown_progress("Updating modules"):
+        update_modules(
+            container,
             path_resolver,
             canonical_mapping,
-            git_repo,
+            revised_time,
+            jobs,
+            revised_times,
         )
 
-    # NOTE: For now we are patching image links incase modules are moved up
-    #       a directory and their links are not updated to match the new path.
-    #       Hopefully this is temporary.
-    with unknown_progress("Patching resource paths"):
-        patch_paths(container, path_resolver, canonical_mapping)
+    with unknown_progress("Updating collections"):
+        update_collection_metadata(path_resolver, revised_time, book_version)
+
+    # Index module metadata now that it is final so that assemble can resolve
+    # links to modules outside of a book without converting them
+    with unknown_progress("Indexing module metadata"):
+        module_index = ModuleIndex.from_dir(input_dir)
+        module_index.update(path_resolver.module_paths_by_id.values())
+        module_index.save()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from itertools import count
+
+from lxml import etree
+
+from .xml_utils import etree_from_str
+
+
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+
+class ContentStore:
+    """Serialized page content, compressed and kept in memory until
+    ``memory_budget`` bytes are held, then written to files in a temporary
+    directory under ``spill_dir``. Trees are parsed again whenever they are
+    needed, so only the pages being worked on are held as trees."""
+
+    def __init__(
+        self, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None, level=1
+    ):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.level = level
+        self.memory_size = 0
+        self.spilled = 0
+        self._in_memory = {}
+        self._tmp_dir = None
+        self._keys = count()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self._tmp_dir, f"{key}.z")
+
+    def put_bytes(self, data, key=None):
+        """Store serialized content, replacing ``key`` when it is given"""
+        compressed = zlib.compress(data, self.level)
+        with self._lock:
+            if key is None:
+                key = next(self._keys)
+            else:
+                self._discard(key)
+            if self.memory_size + len(compressed) <= self.memory_budget:
+                self._in_memory[key] = compressed
+                self.memory_size += len(compressed)
+                return key
+            if self._tmp_dir is None:
+                self._tmp_dir = tempfile.mkdtemp(
+                    prefix="nebu-content-", dir=self.spill_dir
+                )
+            self.spilled += 1
+        with open(self._path(key), "wb") as fout:
+            fout.write(compressed)
+        return key
+
+    def put(self, tree, key=None):
+        return self.put_bytes(etree.tostring(tree, encoding="utf-8"), key)
+
+    def _discard(self, key):
+        compressed = self._in_memory.pop(key, None)
+        if compressed is not None:
+            self.memory_size -= len(compressed)
+        elif self._tmp_dir is not None:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def get_bytes(self, key):
+        compressed = self._in_memory.get(key, None)
+        if compressed is None:
+            with open(self._path(key), "rb") as fin:
+                compressed = fin.read()
+        return zlib.decompress(compressed)
+
+    def get(self, key):
+        return etree_from_str(self.get_bytes(key))
+
+    def close(self):
+        self._in_memory.clear()
+        self.memory_size = 0
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
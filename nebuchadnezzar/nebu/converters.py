@@ -9,6 +9,7 @@
 
 import os
 import sys
+from functools import lru_cache
 from io import BytesIO
 
 from lxml import etree
@@ -26,14 +27,26 @@ MATHML_XSL_PATH = os.path.abspath(os.path.join(
     LOCAL_XSL_DIR, 'content2presentation.xsl'))
 
 
+@lru_cache(maxsize=None)
 def _gen_xsl(f, d=LOCAL_XSL_DIR):
+    """Compile a stylesheet the first time it is used"""
     transform = etree.XSLT(etree.parse(os.path.join(d, f)))
     return transform
 
 
-CNXML_TO_HTML_XSL = _gen_xsl('cnxml-to-html5.xsl')
-CNXML_TO_HTML_METADATA_XSL = _gen_xsl('cnxml-to-html5-metadata.xsl')
-MATHML_XSL = _gen_xsl(MATHML_XSL_PATH, '.')
+_XSL_ARGS = {
+    'CNXML_TO_HTML_XSL': ('cnxml-to-html5.xsl',),
+    'CNXML_TO_HTML_METADATA_XSL': ('cnxml-to-html5-metadata.xsl',),
+    'MATHML_XSL': (MATHML_XSL_PATH, '.'),
+}
+
+
+def __getattr__(name):
+    # Compiling the stylesheets takes a while, so only do it when they are
+    # needed instead of whenever the module is imported
+    if name in _XSL_ARGS:
+        return _gen_xsl(*_XSL_ARGS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ############### #
@@ -52,13 +65,13 @@ HTML_TEMPLATE_FOR_CNXML = """\
 def _transform_cnxml_to_html_body(xml):
     """Transform the cnxml XML (``etree.ElementTree``) content body to html."""
     # Tranform content MathML to presentation MathML so MathJax can display it
-    xml = MATHML_XSL(xml)
-    return CNXML_TO_HTML_XSL(xml)
+    xml = _gen_xsl(*_XSL_ARGS['MATHML_XSL'])(xml)
+    return _gen_xsl(*_XSL_ARGS['CNXML_TO_HTML_XSL'])(xml)
 
 
 def _transform_cnxml_to_html_metadata(xml):
     """Transform the cnxml XML (``etree.ElementTree``) metadata to html."""
-    return CNXML_TO_HTML_METADATA_XSL(xml)
+    return _gen_xsl(*_XSL_ARGS['CNXML_TO_HTML_METADATA_XSL'])(xml)
 
 
 def ensure_bytes(text):
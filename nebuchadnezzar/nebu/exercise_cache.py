@@ -0,0 +1,53 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class ExerciseCacheMiss(Exception):
+    def __init__(self, url):
+        super().__init__(f"Exercise not in cache: {url}")
+        self.url = url
+
+
+class ExerciseCache:
+    """Exercise json responses stored in ``cache_dir``. Entries are keyed by
+    url and by whether a token was used (tokens include answers). Entries
+    older than ``ttl`` seconds are stale and need to be revalidated."""
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _path(self, url, has_token):
+        key = hashlib.sha256(f"{url}\0{int(has_token)}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, url, has_token) -> Optional[dict]:
+        try:
+            return json.loads(self._path(url, has_token).read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def put(self, url, has_token, data, etag=None):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "fetched_at": time.time(),
+            "data": data,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(entry, fout)
+        os.replace(tmp_path, self._path(url, has_token))
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
@@ -0,0 +1,139 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from copy import deepcopy
+from time import perf_counter
+
+import backoff
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from .exercise_cache import ExerciseCacheMiss
+
+
+logger = logging.getLogger("nebuchadnezzar")
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(index)]
+
+
+class ExerciseClient:
+    """Fetch exercise json through one keep-alive session whose connection
+    pool is sized to the number of concurrent includes. Each url is only
+    requested once; everyone asking for it gets their own copy of the
+    response.
+
+    With a ``cache`` responses are reused between runs: fresh entries are
+    used as is and stale entries are revalidated with their ETag. When
+    ``offline`` is set only the cache is used and misses are errors."""
+
+    def __init__(self, token=None, pool_size=20, cache=None, offline=False):
+        assert not offline or cache is not None, "Offline mode needs a cache"
+        self.token = token
+        self.cache = cache
+        self.offline = offline
+        self.cache_stats = Counter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latencies = []
+        self._lock = threading.Lock()
+        self._responses = {}
+
+    @backoff.on_exception(
+        backoff.expo,
+        RequestException,
+        max_time=60 * 15,
+        giveup=lambda e: (
+            # Give up on non-request error
+            not isinstance(e, RequestException) or (
+                # Give up if the status code is something like 404, 403, etc.
+                e.response is not None and
+                e.response.status_code in range(400, 500)
+            )
+        ),
+        jitter=backoff.full_jitter,
+        raise_on_giveup=True
+    )
+    def _fetch(self, url, etag=None):
+        headers = {}
+        if self.token:
+            headers["Authorization"] = "Bearer {}".format(self.token)
+        if etag:
+            headers["If-None-Match"] = etag
+        start = perf_counter()
+        try:
+            if headers:
+                res = self.session.get(url, headers=headers)
+            else:
+                res = self.session.get(url)
+        finally:
+            with self._lock:
+                self.latencies.append(perf_counter() - start)
+        assert res
+        return res
+
+    def _count(self, outcome):
+        with self._lock:
+            self.cache_stats[outcome] += 1
+
+    def _load(self, url):
+        if self.cache is None:
+            return self._fetch(url).json()
+        has_token = bool(self.token)
+        entry = self.cache.get(url, has_token)
+        if entry is not None and (self.offline or self.cache.is_fresh(entry)):
+            self._count("hits")
+            return entry["data"]
+        if self.offline:
+            self._count("misses")
+            raise ExerciseCacheMiss(url)
+        res = self._fetch(url, entry and entry["etag"])
+        if res.status_code == 304:
+            self._count("revalidated")
+            data, etag = entry["data"], res.headers.get("ETag", entry["etag"])
+        else:
+            self._count("misses")
+            data, etag = res.json(), res.headers.get("ETag")
+        self.cache.put(url, has_token, data, etag)
+        return data
+
+    def get_json(self, url):
+        with self._lock:
+            future = self._responses.get(url, None)
+            is_owner = future is None
+            if is_owner:
+                future = self._responses[url] = Future()
+        if is_owner:
+            try:
+                future.set_result(self._load(url))
+            except BaseException as e:
+                future.set_exception(e)
+        return deepcopy(future.result())
+
+    def log_stats(self):
+        if self.cache is not None:
+            stats = self.cache_stats
+            logger.info(
+                f"Exercise cache: {stats['hits']} hits, "
+                f"{stats['revalidated']} revalidated, "
+                f"{stats['misses']} misses ({self.cache.cache_dir})"
+            )
+        if not self.latencies:
+            return
+        latencies = sorted(self.latencies)
+        percentiles = ", ".join(
+            f"p{p}={round(_percentile(latencies, p) * 1000)}ms"
+            for p in (50, 90, 99)
+        )
+        logger.info(
+            f"Exercise requests: {len(latencies)} requests for "
+            f"{len(self._responses)} urls ({percentiles}, "
+            f"max={round(latencies[-1] * 1000)}ms)"
+        )
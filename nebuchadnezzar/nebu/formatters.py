@@ -8,19 +8,17 @@
 import asyncio
 import os
 import logging
+import threading
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from functools import lru_cache
 
-import jinja2
 import lxml.html
 from lxml import etree
 
-import requests
-from requests.exceptions import RequestException
-import backoff
-
 from .converters import cnxml_abstract_to_html
-from .templates.exercise_template import EXERCISE_TEMPLATE
 from .xml_utils import (
     HTML_DOCUMENT_NAMESPACES,
     etree_from_str,
@@ -33,28 +31,61 @@ from . import h5p_injection
 
 logger = logging.getLogger("nebuchadnezzar")
 
+INCLUDE_THREADS = 20
+
+HTML_LINK_TAGS = ("a", "{{{}}}a".format(HTML_DOCUMENT_NAMESPACES["xhtml"]))
+
+
+def _raise_include_errors(errors):
+    if len(errors) != 0:
+        raise Exception(
+            "The following errors occurred: \n" +
+            "\n###### NEXT ERROR ######\n".join(errors)
+        )
 
-def insert_includes(root_elem, page_uuids, includes, threads=20):
-    async def async_exercise_fetching():
+
+def insert_includes(root_elem, page_uuids, includes, threads=INCLUDE_THREADS):
+    """Replace the elements matched by each include's xpath.
+
+    Includes are ``(xpath, callback, concurrent)`` tuples where the callback
+    is called with the matched element and the page uuids. A callback may
+    return a function that edits the tree; it is called after the callback
+    returns. Concurrent callbacks run in ``threads`` threads and must not
+    edit the tree themselves: once all of them are done, the functions they
+    returned are called one at a time in document order.
+    """
+    async def async_exercise_fetching(executor):
         loop = asyncio.get_running_loop()
         for match, proc, concurrent in includes:
             if concurrent:
                 job_queue = AsyncJobQueue(threads)
+                jobs = []
                 async with job_queue as q:
                     for elem in xpath_html(root_elem, match):
-                        q.put_nowait(
-                            loop.run_in_executor(None, proc, elem, page_uuids)
+                        job = loop.run_in_executor(
+                            executor, proc, elem, page_uuids
                         )
-                if len(job_queue.errors) != 0:
-                    raise Exception(
-                        "The following errors occurred: \n" +
-                        "\n###### NEXT ERROR ######\n".join(job_queue.errors)
-                    )
+                        jobs.append(job)
+                        q.put_nowait(job)
+                _raise_include_errors(job_queue.errors)
+                errors = []
+                for job in jobs:
+                    splice = job.result()
+                    if splice is None:
+                        continue
+                    try:
+                        splice()
+                    except Exception:
+                        errors.append(traceback.format_exc())
+                _raise_include_errors(errors)
             else:
                 for elem in xpath_html(root_elem, match):
-                    proc(elem, page_uuids)
+                    splice = proc(elem, page_uuids)
+                    if splice is not None:
+                        splice()
 
-    asyncio.run(async_exercise_fetching())
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        asyncio.run(async_exercise_fetching(executor))
 
 
 def update_ids(document):
@@ -82,49 +113,109 @@ def update_ids(document):
 
 
 @lru_cache(maxsize=None)
-def _get_external_document(p):
-    from .models.book_part import BookPart
+def _read_external_metadata(p):
+    from .models.module_index import read_module_metadata
 
-    return BookPart.doc_from_file(p)
+    return read_module_metadata(p)
 
 
-def resolve_module_links(document, docs_by_id, path_resolver):
+def _get_external_uuid(p, module_index=None):
+    # Only the uuid is needed, so avoid converting the whole module
+    if module_index is not None:
+        return module_index.get(p).uuid
+    return _read_external_metadata(p).uuid
+
+
+def _resolve_module_link(
+    document, href, docs_by_id, path_resolver, module_index=None
+):
+    href = href.strip()
+    if len(href) == 0:  # pragma: no cover
+        logger.warning(f"Empty link in \"{document.metadata['id']}\"")
+        return None
+    if not href.startswith("/m"):  # pragma: no cover
+        return None
+    fragment_idx = href.find("#")
+    if fragment_idx != -1:
+        module_id = href[1:fragment_idx]
+        fragment = href[fragment_idx:].replace("#", "_")
+        fmt_str = f"#auto_{{}}{fragment}"
+    else:
+        module_id = href[1:]
+        fmt_str = "#page_{}"
+    target_document = docs_by_id.get(module_id, None)
+    if target_document is not None:
+        return fmt_str.format(target_document.metadata["uuid"])
+    uuid = _get_external_uuid(
+        path_resolver.get_module_path(module_id), module_index
+    )
+    return f"/contents{href.replace(module_id, uuid)}"
+
+
+def resolve_module_links(
+    document, docs_by_id, path_resolver, module_index=None
+):
     """Resolve module links
     <a href="/contents/{PAGE_ID} (and maybe fragment?)"> (other-book link)
     <a href="#page_{PAGE_ID}"> (same-book link)
     <a href="#auto_{PAGE_ID}_{TARGET_ID}"> (element on a page)
     """
     for link in document.content.xpath("//*[@href]"):
-        href = link.get("href", "").strip()
-        if len(href) == 0:  # pragma: no cover
-            logger.warning(f"Empty link in \"{document.metadata['id']}\"")
-            continue
-        if not href.startswith("/m"):  # pragma: no cover
+        new_href = _resolve_module_link(
+            document,
+            link.get("href", ""),
+            docs_by_id,
+            path_resolver,
+            module_index,
+        )
+        if new_href is not None:
+            link.set("href", new_href)
+
+
+def resolve_module_links_and_update_ids(
+    document, docs_by_id, path_resolver, module_index=None
+):
+    """Same as ``resolve_module_links`` followed by ``update_ids``, in one
+    walk over the elements of the document content that have an href or an
+    id. The content is expected to be the root of its tree.
+    """
+    content = document.content
+    document_id = document.metadata["uuid"]
+    old_id_to_new_id = {}
+    fragment_links = []
+    for elem in content.iter(etree.Element):
+        if not elem.keys():
             continue
-        fragment_idx = href.find("#")
-        if fragment_idx != -1:
-            module_id = href[1:fragment_idx]
-            fragment = href[fragment_idx:].replace("#", "_")
-            fmt_str = f"#auto_{{}}{fragment}"
-        else:
-            module_id = href[1:]
-            fmt_str = "#page_{}"
-        target_document = docs_by_id.get(module_id, None)
-        if target_document is not None:
-            new_href = fmt_str.format(target_document.metadata["uuid"])
-        else:
-            target_document = _get_external_document(
-                path_resolver.get_module_path(module_id)
+        href = elem.get("href")
+        if href is not None:
+            new_href = _resolve_module_link(
+                document, href, docs_by_id, path_resolver, module_index
             )
-            uuid = target_document.metadata["uuid"]
-            new_href = f"/contents{href.replace(module_id, uuid)}"
-        link.set("href", new_href)
+            if new_href is not None:
+                elem.set("href", new_href)
+                href = new_href
+            if href.startswith("#") and elem.tag in HTML_LINK_TAGS:
+                fragment_links.append((elem, href[1:]))
+        old_id = elem.get("id")
+        if old_id is not None and elem is not content:
+            new_id = "auto_{}_{}".format(document_id, old_id)
+            elem.set("id", new_id)
+            old_id_to_new_id[old_id] = new_id
+
+    # Links can come before the elements they point to
+    for a, old_id in fragment_links:
+        new_id = old_id_to_new_id.get(old_id, None)
+        if new_id is not None:
+            a.set("href", "#{}".format(new_id))
 
 
+@lru_cache(maxsize=None)
 def _create_html_template():
     def isdict(v):  # pragma: no cover
         return isinstance(v, dict)
 
+    import jinja2
+
     template_env = jinja2.Environment(trim_blocks=True, lstrip_blocks=True)
     return template_env.from_string(HTML_DOCUMENT, globals={"isdict": isdict})
 
@@ -148,14 +239,17 @@ def _col_to_html(book_part):
     )
 
 
-def _doc_to_html(document):
+def _get_body(document):
     # Determine if we've been fed a full XHTML page, with a <body> tag:
     bods = xpath_html(
         document.content,
         "//*[self::body|self::xhtml:body]",
     )
     assert bods, "Content must have <body>"
-    root = bods[0]
+    return bods[0]
+
+
+def _doc_metadata(document):
     # TODO: maybe include this summary in parse_metadata instead. Granted, it
     #       seems most relevant here
     metadata = copy(document.metadata)
@@ -165,13 +259,264 @@ def _doc_to_html(document):
         s = cnxml_abstract_to_html(metadata["summary"])
         s = etree_from_str(s)
         metadata["summary"] = squash_xml_to_text(s, remove_namespaces=True)
+    return metadata
+
+
+def _doc_to_html(document):
+    root = _get_body(document)
     return _create_html_doc(
-        metadata=metadata,
+        metadata=_doc_metadata(document),
         content=etree_to_content(root, strip_root_node=True),
         root_attrs={k: root.get(k) for k in root.keys()},
     )
 
 
+# The functions below build the same elements that parsing the rendered
+# HTML_DOCUMENT would produce, including its whitespace, without the round
+# trip through a string. Metadata that only the template knows how to
+# render makes them fall back to the template.
+HTML_DOCUMENT_NSMAP = {
+    None: "http://www.w3.org/1999/xhtml",
+    "epub": "http://www.idpf.org/2007/ops",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "lrmi": "http://lrmi.net/the-specification",
+    "bib": "http://bibtexml.sf.net/",
+    "data": "http://www.w3.org/TR/html5/dom.html#custom-data-attribute",
+    "qml": "http://cnx.rice.edu/qml/1.0",
+    "datadev": "http://dev.w3.org/html5/spec/#custom",
+    "mod": "http://cnx.rice.edu/#moduleIds",
+    "md": "http://cnx.rice.edu/mdml",
+    "c": "http://cnx.rice.edu/cnxml",
+}
+TEMPLATE_ONLY_METADATA = (
+    "authors",
+    "publishers",
+    "derived_from_uri",
+    "copyright-holder",
+    "copyright_holders",
+    "cnx-archive-shortid",
+    "keywords",
+    "subjects",
+)
+ACCESSIBILITY_FEATURES = (
+    "MathML",
+    "LaTeX",
+    "alternativeText",
+    "captions",
+    "structuredNavigation",
+)
+
+
+def _is_buildable(metadata):
+    return not any(metadata.get(k) for k in TEMPLATE_ONLY_METADATA)
+
+
+def _xhtml(tag):
+    return f"{{{HTML_DOCUMENT_NSMAP[None]}}}{tag}"
+
+
+def _append_text(parent, text):
+    if len(parent) == 0:
+        parent.text = (parent.text or "") + text
+    else:
+        parent[-1].tail = (parent[-1].tail or "") + text
+
+
+def _template_value(metadata, key):
+    # Same as {{ metadata[key] }}
+    return str(metadata[key]) if key in metadata else ""
+
+
+def _build_metadata(parent, metadata, is_translucent=False):
+    def span(data_type, value):
+        _append_text(div, "      ")
+        etree.SubElement(
+            div, _xhtml("span"), {"data-type": data_type, "data-value": value}
+        )
+
+    div = etree.SubElement(
+        parent,
+        _xhtml("div"),
+        {"data-type": "metadata", "style": "display: none;"},
+    )
+    div.text = "\n      "
+    etree.SubElement(
+        div,
+        _xhtml("h1"),
+        {"data-type": "document-title", "itemprop": "name"},
+    ).text = _template_value(metadata, "title") or None
+    _append_text(div, "\n")
+    for key, data_type in (
+        ("revised", "revised"),
+        ("canonical_book_uuid", "canonical-book-uuid"),
+        ("slug", "slug"),
+    ):
+        if metadata.get(key):
+            span(data_type, str(metadata[key]))
+            _append_text(div, "\n")
+    if is_translucent:
+        span("binding", "translucent")
+    if metadata.get("cnx-archive-uri"):
+        span("cnx-archive-uri", str(metadata["cnx-archive-uri"]))
+        _append_text(div, "\n")
+    if metadata.get("license_url"):
+        _append_text(div, "\n      ")
+        permissions = etree.SubElement(
+            div, _xhtml("div"), {"class": "permissions"}
+        )
+        permissions.text = "\n        "
+        p = etree.SubElement(permissions, _xhtml("p"), {"class": "license"})
+        p.text = "\n          Licensed:\n          "
+        etree.SubElement(
+            p,
+            _xhtml("a"),
+            {
+                "href": str(metadata["license_url"]),
+                "itemprop": "dc:license,lrmi:useRightsURL",
+                "data-type": "license",
+            },
+        ).text = _template_value(metadata, "license_text") or None
+        _append_text(p, "\n        ")
+        _append_text(permissions, "\n      ")
+    if metadata.get("summary"):
+        _append_text(div, "\n      ")
+        description = etree.SubElement(
+            div,
+            _xhtml("div"),
+            {
+                "class": "description",
+                "itemprop": "description",
+                "data-type": "description",
+            },
+        )
+        xmlns = " ".join(
+            f'xmlns{"" if prefix is None else ":" + prefix}="{uri}"'
+            for prefix, uri in HTML_DOCUMENT_NSMAP.items()
+        )
+        summary = etree_from_str(f"<div {xmlns}>{metadata['summary']}</div>")
+        description.text = "\n        " + (summary.text or "")
+        description.extend(summary)
+        _append_text(description, "\n      ")
+    _append_text(div, "    ")
+    return div
+
+
+def _build_toc(parent, tree):
+    nav = etree.SubElement(parent, _xhtml("nav"), id="toc")
+    html_listify(tree, etree.SubElement(nav, _xhtml("ol")))
+    # html_listify creates elements without a namespace
+    for elem in nav.iter(tag=etree.Element):
+        if not elem.tag.startswith("{"):
+            elem.tag = _xhtml(elem.tag)
+    return nav
+
+
+def _build_html_document(book_part):
+    metadata = book_part.metadata
+    if not _is_buildable(metadata):
+        return etree_from_str(_col_to_html(book_part))
+
+    def meta(attrs):
+        _append_text(head, "    ")
+        etree.SubElement(head, _xhtml("meta"), attrs)
+
+    root = etree.Element(_xhtml("html"), nsmap=HTML_DOCUMENT_NSMAP)
+    if metadata.get("language"):
+        root.set("lang", str(metadata["language"]))
+    root.text = "\n  "
+    head = etree.SubElement(
+        root,
+        _xhtml("head"),
+        {"itemscope": "itemscope", "itemtype": "http://schema.org/Book"},
+    )
+    head.text = "\n\n    "
+    etree.SubElement(head, _xhtml("title")).text = (
+        _template_value(metadata, "title") or None
+    )
+    _append_text(head, "\n")
+    if metadata.get("language"):
+        meta({
+            "itemprop": "inLanguage",
+            "data-type": "language",
+            "content": str(metadata["language"]),
+        })
+        _append_text(head, "\n")
+    _append_text(head, "\n    ")
+    head.append(etree.Comment(
+        " These are for discoverability of accessible content. "
+    ))
+    _append_text(head, "\n")
+    for feature in ACCESSIBILITY_FEATURES:
+        meta({"itemprop": "accessibilityFeature", "content": feature})
+        _append_text(head, "\n")
+    _append_text(head, "\n\n")
+    if metadata.get("created"):
+        meta({"itemprop": "dateCreated", "content": str(metadata["created"])})
+        _append_text(head, "\n")
+    meta({
+        "itemprop": "dateModified",
+        "content": _template_value(metadata, "revised"),
+    })
+    _append_text(head, "\n  ")
+    head.tail = "\n  "
+    body = etree.SubElement(
+        root,
+        _xhtml("body"),
+        {"itemscope": "itemscope", "itemtype": "http://schema.org/Book"},
+    )
+    body.text = "\n    "
+    div = _build_metadata(body, metadata, is_translucent=book_part.is_subcol)
+    div.tail = "\n\n   "
+    _build_toc(body, book_part)
+    _append_text(body, "\n  ")
+    body.tail = "\n"
+    return root
+
+
+def _build_col_metadata(parent, book_part):
+    if not _is_buildable(book_part.metadata):
+        doc_root = etree_from_str(_col_to_html(book_part))
+        # Extract the metadata
+        metadata = xpath_html(
+            doc_root,
+            '//xhtml:body/xhtml:div[@data-type="metadata"]',
+        )
+        if metadata:
+            parent.append(metadata[0])
+        return
+    div = _build_metadata(
+        parent, book_part.metadata, is_translucent=book_part.is_subcol
+    )
+    div.tail = "\n\n   "
+
+
+def _build_doc_content(parent, document):
+    metadata = _doc_metadata(document)
+    if not _is_buildable(metadata):
+        html = _doc_to_html(document)
+        doc_root = etree_from_str(html)
+        body = xpath_html(doc_root, "//xhtml:body")[0]
+        attrs = body.attrib
+        parent.extend(list(body))
+    else:
+        body = _get_body(document)
+        attrs = body.attrib
+        div = _build_metadata(parent, metadata)
+        div.tail = "\n\n   " + (body.text or "")
+        for child in body.iterchildren():
+            child = copy(child)
+            # etree_to_content(..., strip_root_node=True) includes the tail
+            # of each child twice
+            if child.tail:
+                child.tail *= 2
+            parent.append(child)
+        _append_text(parent, "\n  ")
+    for a in attrs:
+        if not (a.startswith("item")):
+            parent.set(a, attrs.get(a))
+
+
 def _get_node_type(book_part, parent=None):
     """If node is a document, the type is page.
     If node is a binder with no parent, the type is book.
@@ -211,16 +556,7 @@ def assemble_collection(collection):
 
             child_elem = etree.SubElement(elem, "div", **attrs)
             if book_part.is_subcol or book_part.is_col:
-                # Build the subcol to html (making a nav element, etc.)
-                html = _col_to_html(book_part)
-                doc_root = etree_from_str(html)
-                # Extract the metadata
-                metadata = xpath_html(
-                    doc_root,
-                    '//xhtml:body/xhtml:div[@data-type="metadata"]',
-                )
-                if metadata:
-                    child_elem.append(metadata[0])
+                _build_col_metadata(child_elem, book_part)
 
                 # And now the top-level title, too
                 etree.SubElement(
@@ -228,22 +564,71 @@ def assemble_collection(collection):
                 ).text = book_part.metadata["title"]
                 recursive_build(book_part, child_elem)
             elif book_part.is_doc:
-                html = _doc_to_html(book_part)
-                doc_root = etree_from_str(html)
-                body = xpath_html(doc_root, "//xhtml:body")[0]
-                for c in body.iterchildren():
-                    child_elem.append(c)
-                for a in body.attrib:
-                    if not (a.startswith("item")):
-                        child_elem.set(a, body.get(a))
-
-    root = etree_from_str(_col_to_html(collection))
+                _build_doc_content(child_elem, book_part)
+                # The content was copied into the book
+                book_part.release_content(changed=False)
+
+    root = _build_html_document(collection)
     body = xpath_html(root, "//xhtml:body")[0]
     recursive_build(collection, body)
     return root
 
 
-def parse_context_tags(tags, elem, page_uuids):
+class IdIndex:
+    """Elements of an assembled book by id, along with the pages that
+    contain them. Build it once ids are final, after ``update_ids`` and
+    ``assemble_collection``; splicing includes keeps it up to date."""
+
+    def __init__(self, root):
+        self.elements = {}
+        self.pages = defaultdict(list)
+        self.add(root)
+
+    def add(self, elem, page=None):
+        """Index the ids under ``elem``. Without a ``page``, ids are indexed
+        under the pages found under ``elem``."""
+        for child in elem.iter(etree.Element):
+            id_ = child.get("id")
+            if id_ is not None:
+                self.elements.setdefault(id_, child)
+        if page is not None:
+            self._add_page(page, elem.iter(etree.Element))
+        else:
+            for child in elem.iter(etree.Element):
+                if child.get("data-type") == "page":
+                    self._add_page(
+                        child, child.iterdescendants(etree.Element)
+                    )
+
+    def _add_page(self, page, elems):
+        for elem in elems:
+            id_ = elem.get("id")
+            if id_ is not None:
+                self.pages[id_].append(page)
+
+    def get(self, id_):
+        return self.elements.get(id_, None)
+
+    def in_page(self, id_, page):
+        return any(p is page for p in self.pages.get(id_, ()))
+
+
+def _id_index_getter(id_index=None):
+    """Return a function that gets ``id_index``, building it from the tree
+    of the element it is given the first time if there is none"""
+    lock = threading.Lock()
+
+    def get_id_index(elem):
+        nonlocal id_index
+        with lock:
+            if id_index is None:
+                id_index = IdIndex(elem.getroottree().getroot())
+        return id_index
+
+    return get_id_index
+
+
+def parse_context_tags(tags, elem, page_uuids, id_index=None):
     if not tags:
         return
 
@@ -273,7 +658,7 @@ def parse_context_tags(tags, elem, page_uuids):
         # Strip `page_` prefix from ID to get UUID
         parent_page_uuid = parent_page_uuid.split("page_")[1]
 
-    candidate_uuids = set(modules) & set(page_uuids)
+    candidate_uuids = set(m for m in modules if m in page_uuids)
 
     # Check if the target feature ID is on the parent page for this
     # exercise. If so, that takes priority over any context-cnxmod tag
@@ -281,10 +666,16 @@ def parse_context_tags(tags, elem, page_uuids):
     # doesn't match one of the exercise tags. If the feature exists,
     # we make sure the parent page UUID is included in candidate_uuids.
     # Otherwise, remove parent page from candidate UUIDs.
-    maybe_feature = parent_page_elem.find(
-        './/*[@id="auto_{}_{}"]'.format(parent_page_uuid, feature)
-    )
-    if maybe_feature is None:
+    feature_ref = get_context_ref(parent_page_uuid, feature)
+    if id_index is None:
+        # Indexing the whole book for one lookup would cost more than
+        # searching the parent page
+        in_parent_page = (
+            parent_page_elem.find(f'.//*[@id="{feature_ref}"]') is not None
+        )
+    else:
+        in_parent_page = id_index.in_page(feature_ref, parent_page_elem)
+    if not in_parent_page:
         candidate_uuids.discard(parent_page_uuid)
     else:
         candidate_uuids.add(parent_page_uuid)
@@ -306,29 +697,46 @@ def parse_context_tags(tags, elem, page_uuids):
     return target_module, feature
 
 
-def annotate_exercise(exercise, elem, target_module, feature):
-    # As a final validation check, confirm the feature is on the target
-    # module and otherwise raise
-    #
-    # NOTE: The following uses xpath() and find() together which may seem
-    # bizarre, but it's a work around for the fact that using just an
-    # xpath of '//*[@id="auto_{}_{}"]' results in seg faults when there
-    # are multiple threads due to the tree editing that occurs in
-    # _replace_exercises.
-    target_ref = "auto_{}_{}".format(target_module, feature)
-    feature_element = elem.xpath("/*")[0].find(
-        './/*[@id="{}"]'.format(target_ref)
+def get_context_ref(target_module, feature):
+    return "auto_{}_{}".format(target_module, feature)
+
+
+def annotate_exercise(exercise, target_module, feature):
+    exercise["required_context"] = {}
+    exercise["required_context"]["module"] = target_module
+    exercise["required_context"]["feature"] = feature
+    exercise["required_context"]["ref"] = get_context_ref(
+        target_module, feature
     )
 
+
+def validate_exercise_context(elem, target_module, feature, id_index):
+    # As a final validation check, confirm the feature is on the target
+    # module and otherwise raise. This runs while includes are spliced in,
+    # which is when nothing else is editing the tree.
+    feature_element = id_index.get(get_context_ref(target_module, feature))
+
     assert_msg = "Feature {} not in {} href={}".format(
         feature, target_module, elem.get("href")
     )
     assert feature_element is not None, assert_msg
 
-    exercise["required_context"] = {}
-    exercise["required_context"]["module"] = target_module
-    exercise["required_context"]["feature"] = feature
-    exercise["required_context"]["ref"] = target_ref
+
+def splice_include(elem, root_elem, id_index, context=None):
+    """Replace ``elem`` with the children of the detached ``root_elem``
+    after checking the exercise ``context`` (target module, feature)"""
+    if context is not None:
+        validate_exercise_context(elem, *context, id_index)
+    parent = elem.getparent()
+    for page in elem.iterancestors():
+        if page.get("data-type") == "page":
+            break
+    else:
+        page = None
+    for child in root_elem:
+        id_index.add(child, page)
+        parent.insert(parent.index(elem), child)
+    parent.remove(elem)  # Special case - assumes single wrapper elem
 
 
 def get_exercise_placeholder(message, data_type):
@@ -381,48 +789,37 @@ def get_parent_page_uuid(elem):
     return parent_page_elem.get("id").lstrip("page_")
 
 
-def exercise_callback_factory(match, url_template, token=None):
+def exercise_callback_factory(
+    match, url_template, token=None, client=None, id_index=None
+):
     """Create a callback function to replace an exercise by fetching from
-    a server."""
+    a server. Factories sharing a ``client`` share its connection pool and
+    its responses."""
+    if client is None:
+        from .exercise_client import ExerciseClient
+
+        client = ExerciseClient(token)
+    get_id_index = _id_index_getter(id_index)
 
     def _annotate_exercise(elem, data, page_uuids):
         """Annotate exercise based upon tag data"""
         exercise = data["items"][0]
         tags = exercise.get("tags", [])
-        context = parse_context_tags(tags, elem, page_uuids)
+        context = parse_context_tags(
+            tags, elem, page_uuids, get_id_index(elem)
+        )
         if context is not None:
-            target_module, feature = context
-            annotate_exercise(exercise, elem, target_module, feature)
-
-    @backoff.on_exception(
-        backoff.expo,
-        RequestException,
-        max_time=60 * 15,
-        giveup=lambda e: (
-            # Give up on non-request error
-            not isinstance(e, RequestException) or (
-                # Give up if the status code is something like 404, 403, etc.
-                e.response is not None and
-                e.response.status_code in range(400, 500)
-            )
-        ),
-        jitter=backoff.full_jitter,
-        raise_on_giveup=True
-    )
+            annotate_exercise(exercise, *context)
+        return context
+
     def _replace_exercises(elem, page_uuids):
         item_code = elem.get("href")[len(match):]
         url = url_template.format(itemCode=item_code)
         exercise_class = elem.get("class")
-        if token:
-            headers = {"Authorization": "Bearer {}".format(token)}
-            res = requests.get(url, headers=headers)
-        else:
-            res = requests.get(url)
-
-        assert res
         # grab the json exercise, run it through Jinja2 template,
         # replace element w/ it
-        exercise = res.json()
+        exercise = client.get_json(url)
+        context = None
 
         if exercise["total_count"] == 0:
             root_elem = get_missing_exercise_placeholder(url, item_code)
@@ -430,17 +827,16 @@ def exercise_callback_factory(match, url_template, token=None):
             parent_page_uuid = get_parent_page_uuid(elem)
             exercise["items"][0]["url"] = url
             exercise["items"][0]["class"] = exercise_class
-            _annotate_exercise(elem, exercise, page_uuids)
+            context = _annotate_exercise(elem, exercise, page_uuids)
             assert len(exercise["items"]) == 1, \
                 'Exercise "items" array is nonsingular'
             exercise_content = exercise["items"][0]
             html = render_exercise(exercise_content, parent_page_uuid)
             root_elem = parse_exercise_html_to_etree(html, item_code)
 
-        parent = elem.getparent()
-        for child in root_elem:
-            parent.insert(parent.index(elem), child)
-        parent.remove(elem)  # Special case - assumes single wrapper elem
+        return lambda: splice_include(
+            elem, root_elem, get_id_index(elem), context
+        )
 
     xpath = '//xhtml:a[contains(@href, "{}")]'.format(match)
     return (xpath, _replace_exercises, True)
@@ -451,9 +847,13 @@ def interactive_callback_factory(
     path_resolver,
     docs_by_id,
     media_handler,
+    id_index=None,
+    prefetch_media=None,
+    interactives=None,
 ):
     """Create a callback function to replace an exercise by fetching from
     the repository."""
+    get_id_index = _id_index_getter(id_index)
 
     def _annotate_exercise(elem, exercise, metadata, page_uuids):
         """Annotate exercise based upon tag data"""
@@ -481,13 +881,6 @@ def interactive_callback_factory(
                 else:  # pragma: no cover
                     # Ignore context linking to different book for now
                     # until a more formal decision is made
-                    # # If we already found one more specific, we can skip and
-                    # # avoid loading additional documents
-                    # if last_specificity > specificity_by_name["diff_book"]:
-                    #     continue
-                    # module_path = path_resolver.get_module_path(module_id)
-                    # document = _get_external_document(module_path)
-                    # specificity = specificity_by_name["diff_book"]
                     continue
 
                 target_module = document.metadata["uuid"]
@@ -499,22 +892,24 @@ def interactive_callback_factory(
                     continue
 
                 # Search assembled document for the referenced element
-                maybe_feature = elem.xpath(
-                    f'//*[@id = "auto_{target_module}_{elem_id}"]'
+                maybe_feature = get_id_index(elem).get(
+                    get_context_ref(target_module, elem_id)
                 )
-                if len(maybe_feature) > 0:
+                if maybe_feature is not None:
                     context_uuid, context_elem_id = target_module, elem_id
                     last_specificity = specificity
             assert context_uuid is not None and context_elem_id is not None, \
                 f'Invalid context: {exercise["nickname"]}'
-            annotate_exercise(exercise, elem, context_uuid, context_elem_id)
+            context = context_uuid, context_elem_id
         else:
             tags = metadata.get("tags", [])
-            context = parse_context_tags(tags, elem, page_uuids)
+            context = parse_context_tags(
+                tags, elem, page_uuids, get_id_index(elem)
+            )
             if context is None:
                 return
-            target_module, feature = context
-            annotate_exercise(exercise, elem, target_module, feature)
+        annotate_exercise(exercise, *context)
+        return context
 
     def _replace_exercises(elem, page_uuids):
         nickname = elem.get("href")[len(match) + 1:]
@@ -526,7 +921,12 @@ def interactive_callback_factory(
             os.path.join(path_resolver.book_container.root_dir, "..")
         )
         css_class = elem.get("class")
-        h5p_in = h5p_injection.load_h5p_interactive(interactive_path)
+        h5p_in = (
+            interactives.load(nickname)
+            if interactives is not None
+            else h5p_injection.load_h5p_interactive(interactive_path)
+        )
+        context, attachments = None, None
 
         if not h5p_in:
             root_elem = get_missing_exercise_placeholder(relpath, nickname)
@@ -549,44 +949,62 @@ def interactive_callback_factory(
                 exercise["questions"] = h5p_injection.questions_from_h5p(
                     nickname, h5p_in
                 )
-                _annotate_exercise(
+                context = _annotate_exercise(
                     elem, exercise, h5p_in["metadata"], page_uuids
                 )
 
                 html = render_exercise(exercise, parent_page_uuid)
                 root_elem = parse_exercise_html_to_etree(html, nickname)
-
-                h5p_injection.handle_attachments(
-                    attachments,
-                    nickname,
-                    root_elem,
-                    media_handler,
-                )
-                for attachment in attachments:
-                    resource_abs_path = path_resolver.find_interactives_path(
-                        nickname, attachment
-                    )
-                    if resource_abs_path is not None:  # pragma: no cover
-                        logger.warning(
-                            "WARNING: Possible unused resource: "
-                            f"{nickname}:{resource_abs_path}"
-                        )
             except h5p_injection.UnsupportedLibraryError as ule:
                 library = ule.args[0]
                 root_elem = get_exercise_placeholder(
                     f"UNSUPPORTED LIBRARY: {library}", "unsupported-library"
                 )
+                attachments = None
+
+        if attachments is not None and prefetch_media is not None:
+            # Read the media while the other interactives are prepared so
+            # that splicing only needs to move it
+            for attachment in attachments:
+                prefetch_media(
+                    path_resolver.get_public_interactives_path(
+                        nickname, attachment
+                    )
+                )
 
-        parent = elem.getparent()
-        for child in root_elem:
-            parent.insert(parent.index(elem), child)
-        parent.remove(elem)  # Special case - assumes single wrapper elem
+        def _splice():
+            # The media handler moves files and shares a cache, so
+            # attachments are handled one interactive at a time
+            if attachments is not None:
+                _handle_attachments(nickname, root_elem, attachments)
+            splice_include(elem, root_elem, get_id_index(elem), context)
+
+        return _splice
+
+    def _handle_attachments(nickname, root_elem, attachments):
+        h5p_injection.handle_attachments(
+            attachments,
+            nickname,
+            root_elem,
+            media_handler,
+        )
+        for attachment in attachments:
+            resource_abs_path = path_resolver.find_interactives_path(
+                nickname, attachment
+            )
+            if resource_abs_path is not None:  # pragma: no cover
+                logger.warning(
+                    "WARNING: Possible unused resource: "
+                    f"{nickname}:{resource_abs_path}"
+                )
 
     xpath = '//xhtml:a[contains(@href, "{}")]'.format(match)
-    return (xpath, _replace_exercises, False)
+    return (xpath, _replace_exercises, True)
 
 
 def render_exercise(exercise, parent_page_uuid):
+    from .templates.exercise_template import EXERCISE_TEMPLATE
+
     return EXERCISE_TEMPLATE.render(
         data=exercise, parent_page_uuid=parent_page_uuid
     )
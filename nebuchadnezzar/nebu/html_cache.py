@@ -0,0 +1,91 @@
+import os
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+from .converters import LOCAL_XSL_DIR
+
+
+logger = logging.getLogger("nebuchadnezzar")
+
+
+DEFAULT_MAX_SIZE = 1 << 30
+
+
+def get_xsl_digest(xsl_dir=LOCAL_XSL_DIR):
+    """Digest every stylesheet used to convert cnxml so that cached html is
+    invalidated whenever the conversion changes"""
+    digest = hashlib.sha256()
+    for p in sorted(Path(xsl_dir).glob("**/*.xsl")):
+        digest.update(str(p.relative_to(xsl_dir)).encode())
+        digest.update(hashlib.sha256(p.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+class HTMLCache:
+    """Content-addressed cache of converted module html stored in
+    ``cache_dir``. Entries are keyed by the digest of the cnxml bytes and the
+    stylesheets. The least recently used entries are evicted once the cache
+    grows larger than ``max_size`` bytes."""
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.xsl_digest = get_xsl_digest()
+        self.hits = 0
+        self.misses = 0
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        return (
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith(".xhtml")
+        )
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.xhtml"
+
+    def key_for_file(self, p):
+        digest = hashlib.sha256(self.xsl_digest.encode())
+        digest.update(hashlib.sha256(Path(p).read_bytes()).digest())
+        return digest.hexdigest()
+
+    def get(self, key) -> Optional[str]:
+        path = self._path(key)
+        try:
+            html = path.read_text("utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Bump the modification time so that eviction is least recently used
+        os.utime(path)
+        self.hits += 1
+        return html
+
+    def put(self, key, html: str):
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(html, "utf-8")
+        if path.exists():
+            self.size -= path.stat().st_size
+        os.replace(tmp_path, path)
+        self.size += path.stat().st_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_size:
+                break
+            self.size -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def log_stats(self):
+        logger.info(
+            f"Module html cache: {self.hits} hits, {self.misses} misses "
+            f"({round(self.size / (1 << 20), 2)}MiB in {self.cache_dir})"
+        )
@@ -1,7 +1,12 @@
 import os
+import json
 import hashlib
 import logging
 import mimetypes
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import Future
 
 import filetype
 import imagesize
@@ -82,13 +87,19 @@ def get_size(filepath):
         return int(width), int(height)
 
 
-def get_media_metadata(resource_abs_path, is_image):
+def get_media_metadata(resource_abs_path, is_image, metadata_cache=None):
     resource_name = os.path.basename(resource_abs_path)
-    sha1, s3_md5 = get_checksums(resource_abs_path)
-    mime_type = get_mime_type(resource_abs_path)
-    opt_width, opt_height = (
-        get_size(resource_abs_path) if is_image else (None, None)
-    )
+    if metadata_cache is not None:
+        sha1, s3_md5, mime_type, width, height = metadata_cache.get(
+            resource_abs_path
+        )
+        opt_width, opt_height = (width, height) if is_image else (None, None)
+    else:
+        sha1, s3_md5 = get_checksums(resource_abs_path)
+        mime_type = get_mime_type(resource_abs_path)
+        opt_width, opt_height = (
+            get_size(resource_abs_path) if is_image else (None, None)
+        )
     metadata = json_metadata_factory(
         sha1,
         mime_type,
@@ -98,3 +109,94 @@ def get_media_metadata(resource_abs_path, is_image):
         opt_height,
     )
     return sha1, metadata
+
+
+MEDIA_CACHE_FILENAME = "media-metadata.json"
+
+
+def _compute_media_info(p):
+    sha1, s3_md5 = get_checksums(p)
+    width, height = get_size(p)
+    return [sha1, s3_md5, get_mime_type(p), width, height]
+
+
+class MediaMetadataCache:
+    """Checksums, mime type and size of media files keyed by path, size,
+    modification time and inode. With a ``cache_dir`` entries are kept
+    between runs. Each file is only read once even when it is asked for
+    from several threads at the same time."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_path = None
+        self.entries = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.cache_path = os.path.join(cache_dir, MEDIA_CACHE_FILENAME)
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as fin:
+                    self.entries = json.load(fin)
+            except (FileNotFoundError, ValueError):
+                pass
+        self.stats = Counter()
+        self.changed = False
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @staticmethod
+    def _stat_key(stat):
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+    def get(self, p):
+        """Get ``(sha1, s3_md5, mime_type, width, height)`` of the file at
+        ``p``. The width and height are -1 when it is not an image."""
+        p = os.path.abspath(p)
+        stat_key = self._stat_key(os.stat(p))
+        with self._lock:
+            entry = self.entries.get(p, None)
+            if entry is not None and entry["stat"] == stat_key:
+                self.stats["hits"] += 1
+                return tuple(entry["info"])
+            future = self._pending.get(p, None)
+            is_owner = future is None
+            if is_owner:
+                future = self._pending[p] = Future()
+        if is_owner:
+            try:
+                info = _compute_media_info(p)
+                with self._lock:
+                    self.stats["misses"] += 1
+                    self.entries[p] = {"stat": stat_key, "info": info}
+                    self.changed = True
+                future.set_result(info)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._pending[p]
+        return tuple(future.result())
+
+    def prefetch(self, p):
+        """Read the file at ``p`` ahead of time when it exists. Errors are
+        left for whoever needs the file to report."""
+        try:
+            if os.path.isfile(p):
+                self.get(p)
+        except Exception:  # pragma: no cover
+            pass
+
+    def save(self):
+        if self.cache_path is None or not self.changed:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.cache_path), suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(self.entries, fout)
+        os.replace(tmp_path, self.cache_path)
+        self.changed = False
+
+    def log_stats(self):
+        logger.info(
+            f"Media metadata cache: {self.stats['hits']} hits, "
+            f"{self.stats['misses']} misses"
+        )
@@ -1,3 +1,4 @@
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from typing import Optional
 
@@ -12,6 +13,57 @@ MODULE_TAG = "{http://cnx.rice.edu/collxml}module"
 TITLE_TAG = "{http://cnx.rice.edu/mdml}title"
 
 
+def convert_module(p, html_cache=None):
+    """Convert the module at ``p`` to html.
+
+    This is the unit of work handed to each worker when converting modules
+    in parallel, so it only returns picklable values: the parsed metadata
+    and the serialized html.
+
+    """
+    cnxml = open_xml(p)
+    metadata = parse_metadata(cnxml)
+    if html_cache is None:
+        return metadata, etree_cnxml_to_full_html(cnxml)
+    key = html_cache.key_for_file(p)
+    html = html_cache.get(key)
+    if html is None:
+        html = etree_cnxml_to_full_html(cnxml)
+        html_cache.put(key, html)
+    return metadata, html
+
+
+def convert_modules(module_paths_by_id, jobs, html_cache=None):
+    """Convert modules in a process pool, returning the metadata and html of
+    each module by id in the same order as ``module_paths_by_id``"""
+    converted_by_id = {}
+    keys_by_id = {}
+    if html_cache is not None:
+        # Only hand the modules that are not cached to the workers
+        for module_id, p in module_paths_by_id.items():
+            key = keys_by_id[module_id] = html_cache.key_for_file(p)
+            html = html_cache.get(key)
+            if html is not None:
+                metadata = parse_metadata(open_xml(p))
+                converted_by_id[module_id] = (metadata, html)
+    pending = [
+        module_id for module_id in module_paths_by_id
+        if module_id not in converted_by_id
+    ]
+    with ProcessPoolExecutor(jobs) as executor:
+        for module_id, converted in zip(pending, executor.map(
+            convert_module,
+            (module_paths_by_id[module_id] for module_id in pending),
+        )):
+            converted_by_id[module_id] = converted
+            if html_cache is not None:
+                html_cache.put(keys_by_id[module_id], converted[1])
+    return {
+        module_id: converted_by_id[module_id]
+        for module_id in module_paths_by_id
+    }
+
+
 class PartType(Enum):
     COLLECTION = 0
     SUBCOL = 1
@@ -22,14 +74,38 @@ class BookPart:
     type: PartType
     metadata: dict[str, Optional[str | dict]]
     children: list["BookPart"]
-    content: Optional[Elementish]
 
-    def __init__(self, type, metadata, content=None):
+    def __init__(self, type, metadata, content=None, content_store=None):
         self.type = type
         self.metadata = metadata
         self.children = []
+        self.content_store = content_store
+        self._content_key = None
         self.content = content
 
+    @property
+    def content(self) -> Optional[Elementish]:
+        """The content tree, parsed from the content store on first use
+        when the part has one"""
+        if self._content is None and self._content_key is not None:
+            self._content = self.content_store.get(self._content_key)
+        return self._content
+
+    @content.setter
+    def content(self, content: Optional[Elementish]):
+        self._content = content
+
+    def release_content(self, changed=True):
+        """Hand the content tree back to the content store, saving it again
+        when it ``changed``. Does nothing without a content store."""
+        if self.content_store is None or self._content is None:
+            return
+        if changed or self._content_key is None:
+            self._content_key = self.content_store.put(
+                self._content, self._content_key
+            )
+        self._content = None
+
     @property
     def is_col(self):
         return self.type == PartType.COLLECTION
@@ -70,20 +146,41 @@ class BookPart:
                 yield book_part
 
     @staticmethod
-    def doc_from_file(p):
-        cnxml = open_xml(p)
-        metadata = parse_metadata(cnxml)
-        html = etree_from_str(etree_cnxml_to_full_html(cnxml).encode())
-        doc = BookPart(PartType.DOCUMENT, metadata, html)
+    def doc_from_file(p, html_cache=None, content_store=None):
+        return BookPart.doc_from_converted(
+            *convert_module(p, html_cache), content_store
+        )
+
+    @staticmethod
+    def doc_from_converted(metadata, html, content_store=None):
+        if content_store is None:
+            return BookPart(
+                PartType.DOCUMENT, metadata, etree_from_str(html.encode())
+            )
+        # Keep the html serialized until the content is used
+        doc = BookPart(
+            PartType.DOCUMENT, metadata, content_store=content_store
+        )
+        doc._content_key = content_store.put_bytes(html.encode())
         return doc
 
     @staticmethod
-    def collection_from_file(filepath, path_resolver):
+    def collection_from_file(
+        filepath, path_resolver, jobs=1, html_cache=None, content_store=None
+    ):
         """\
         Given a ``collection.xml`` as ``filepath``.
 
         :param filepath: location of the ``collection.xml`` file
         :type filepath: :class:`pathlib.Path`
+        :param jobs: number of worker processes used to convert modules
+                     (modules are converted serially when this is 1)
+        :type jobs: int
+        :param html_cache: cache consulted before converting each module
+        :type html_cache: :class:`nebu.html_cache.HTMLCache`
+        :param content_store: where the content of documents is kept while
+                              it is not in use
+        :type content_store: :class:`nebu.content_store.ContentStore`
         :return: BookPart object
         :rtype: :class:`BookPart`
 
@@ -100,8 +197,19 @@ class BookPart:
         def new_subcol():
             return BookPart(PartType.SUBCOL, {})
 
+        converted_by_id = {}
+
         def new_doc(id):
-            doc = BookPart.doc_from_file(path_resolver.get_module_path(id))
+            if id in converted_by_id:
+                doc = BookPart.doc_from_converted(
+                    *converted_by_id[id], content_store
+                )
+            else:
+                doc = BookPart.doc_from_file(
+                    path_resolver.get_module_path(id),
+                    html_cache,
+                    content_store,
+                )
             doc_by_id[id] = doc_by_uuid[doc.metadata["uuid"]] = doc
             return doc
 
@@ -109,6 +217,20 @@ class BookPart:
         with open(filepath, "rb") as fb:
             xml = open_xml(fb)
 
+        if jobs > 1:
+            # Convert every module up front, in collection order
+            converted_by_id = convert_modules(
+                {
+                    id: path_resolver.get_module_path(id)
+                    for id in (
+                        elm.attrib["document"]
+                        for elm in xml.iter(MODULE_TAG)
+                    )
+                },
+                jobs,
+                html_cache,
+            )
+
         root_part = parent_part = current_part = new_col()
         parent_stack = []
 
@@ -0,0 +1,121 @@
+import os
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from copy import deepcopy
+from time import perf_counter
+
+from .path_resolver import PathResolver
+from ..h5p_injection import load_h5p_interactive
+
+
+logger = logging.getLogger("nebuchadnezzar")
+
+
+def _list_dirs(root):
+    try:
+        return {entry.name for entry in os.scandir(root) if entry.is_dir()}
+    except FileNotFoundError:
+        return set()
+
+
+def _list_files(root):
+    return {
+        os.path.relpath(os.path.join(dirpath, filename), root)
+        for dirpath, _, filenames in os.walk(root)
+        for filename in filenames
+    }
+
+
+class InteractivesIndex:
+    """The public and private interactives of a book container, listed once
+    instead of checking paths one at a time. Interactives are loaded once
+    per nickname, from any number of threads, and everyone asking for one
+    gets their own copy."""
+
+    def __init__(self, path_resolver: PathResolver):
+        self.path_resolver = path_resolver
+        self.ids_by_kind = {
+            "public": _list_dirs(
+                path_resolver.get_public_interactives_path("")
+            ),
+            "private": _list_dirs(
+                path_resolver.get_private_interactives_path("")
+            ),
+        }
+        self.stats = Counter()
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+        self._files = {}
+        self._interactives = {}
+
+    def _get_path(self, kind, interactive_id, *parts):
+        if kind == "public":
+            return self.path_resolver.get_public_interactives_path(
+                interactive_id, *parts
+            )
+        return self.path_resolver.get_private_interactives_path(
+            interactive_id, *parts
+        )
+
+    def _has_file(self, kind, interactive_id, *parts):
+        if interactive_id not in self.ids_by_kind[kind]:
+            return False
+        relpath = os.path.normpath(os.path.join(*parts)) if parts else "."
+        if relpath == "." or relpath.startswith(os.pardir):
+            return os.path.exists(
+                self._get_path(kind, interactive_id, *parts)
+            )
+        key = (kind, interactive_id)
+        with self._lock:
+            files = self._files.get(key, None)
+            if files is None:
+                files = self._files[key] = _list_files(
+                    self._get_path(kind, interactive_id)
+                )
+        return relpath in files
+
+    def find_interactives_paths(self, interactive_id, *parts: str):
+        """Same as ``PathResolver.find_interactives_paths`` as of when the
+        interactive was first listed"""
+        return {
+            kind: self._get_path(kind, interactive_id, *parts)
+            for kind in ("public", "private")
+            if self._has_file(kind, interactive_id, *parts)
+        }
+
+    def _load(self, nickname):
+        start = perf_counter()
+        try:
+            return load_h5p_interactive(
+                self.path_resolver.get_public_interactives_path(nickname)
+            )
+        finally:
+            with self._lock:
+                self.stats["loads"] += 1
+                self.load_time += perf_counter() - start
+
+    def load(self, nickname):
+        """Same as ``load_h5p_interactive`` for the public interactive"""
+        with self._lock:
+            future = self._interactives.get(nickname, None)
+            is_owner = future is None
+            if is_owner:
+                future = self._interactives[nickname] = Future()
+            else:
+                self.stats["hits"] += 1
+        if is_owner:
+            try:
+                future.set_result(self._load(nickname))
+            except BaseException as e:
+                future.set_exception(e)
+        return deepcopy(future.result())
+
+    def log_stats(self):
+        if not self._interactives:
+            return
+        logger.info(
+            f"Interactives: {self.stats['loads']} loaded in "
+            f"{round(self.load_time * 1000)}ms, {self.stats['hits']} reused"
+        )
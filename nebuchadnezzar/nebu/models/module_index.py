@@ -0,0 +1,112 @@
+import os
+import json
+import tempfile
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+from lxml import etree
+
+from ..parse import NSMAP
+
+
+MODULE_INDEX_FILENAME = ".module-index.json"
+
+_MD = f"{{{NSMAP['md']}}}"
+_C = f"{{{NSMAP['c']}}}"
+
+
+@dataclass
+class ModuleMetadata:
+    uuid: str
+    title: Optional[str]
+    canonical_book_uuid: Optional[str]
+
+
+def read_module_metadata(p) -> ModuleMetadata:
+    """Read the metadata of a cnxml module without parsing its content"""
+    found = {}
+    document_title = None
+    for _, elem in etree.iterparse(
+        str(p),
+        events=("end",),
+        tag=(
+            f"{_MD}uuid",
+            f"{_MD}title",
+            f"{_MD}canonical-book-uuid",
+            f"{_C}title",
+            f"{_C}metadata",
+        ),
+    ):
+        if elem.tag == f"{_C}metadata":
+            break
+        if elem.tag == f"{_C}title":
+            if elem.getparent().tag == f"{_C}document":
+                document_title = "".join(elem.itertext()).strip()
+        else:
+            found.setdefault(elem.tag, elem.text)
+    assert f"{_MD}uuid" in found, f"Expected module uuid in: {p}"
+    return ModuleMetadata(
+        uuid=found[f"{_MD}uuid"],
+        title=document_title or found.get(f"{_MD}title", None),
+        canonical_book_uuid=found.get(f"{_MD}canonical-book-uuid", None),
+    )
+
+
+class ModuleIndex:
+    """Module metadata by module path, persisted in ``index_path``. Entries
+    are read again when the size or modification time of their module
+    changes."""
+
+    def __init__(self, index_path):
+        self.index_path = Path(index_path)
+        self.changed = False
+        try:
+            self.entries = json.loads(self.index_path.read_text("utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def from_dir(directory):
+        return ModuleIndex(Path(directory) / MODULE_INDEX_FILENAME)
+
+    def _key(self, p):
+        return os.path.relpath(p, self.index_path.parent)
+
+    def get(self, p) -> ModuleMetadata:
+        stat = os.stat(p)
+        key = self._key(p)
+        entry = self.entries.get(key, None)
+        if (
+            entry is None or
+            entry["size"] != stat.st_size or
+            entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            entry = self.entries[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "metadata": asdict(read_module_metadata(p)),
+            }
+            self.changed = True
+        return ModuleMetadata(**entry["metadata"])
+
+    def update(self, module_paths):
+        """Index exactly ``module_paths``, forgetting any other module"""
+        keys = set()
+        for p in module_paths:
+            self.get(p)
+            keys.add(self._key(p))
+        for key in set(self.entries) - keys:
+            del self.entries[key]
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.index_path.parent, suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(self.entries, fout)
+        os.replace(tmp_path, self.index_path)
+        self.changed = False
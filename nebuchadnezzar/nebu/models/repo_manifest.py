@@ -0,0 +1,249 @@
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .book_container import BookContainer
+from .path_resolver import PathResolver
+from ..utils import re_first_or_default
+
+
+REPO_MANIFEST_FILENAME = ".repo-manifest.json"
+MODULE_FILE_SUFFIX = ".cnxml"
+
+
+def get_module_id(p):
+    return re_first_or_default(r"m[0-9]+", p)
+
+
+def _file_entry(p, stat):
+    with open(p, "rb") as fin:
+        digest = hashlib.sha256(fin.read()).hexdigest()
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": digest,
+    }
+
+
+def _is_current(entry, stat):
+    return (
+        entry["size"] == stat.st_size and
+        entry["mtime_ns"] == stat.st_mtime_ns
+    )
+
+
+class RepoManifest:
+    """The container, module paths and collection paths of a repository
+    together with the size, modification time and digest of the files they
+    were read from. ``directories`` holds the modification time of every
+    directory under the pages root, which changes whenever a file is added
+    to or removed from it, so only those directories need to be searched
+    again when the manifest is refreshed."""
+
+    def __init__(self, input_dir, directories=None, files=None):
+        self.input_dir = input_dir
+        self.root_dir = os.path.realpath(input_dir)
+        self.books_xml = Path(input_dir) / "META-INF" / "books.xml"
+        self.directories = {} if directories is None else directories
+        self.files = {} if files is None else files
+        self.changed = False
+        self.container = BookContainer.from_str(
+            self.books_xml.read_bytes(), input_dir
+        )
+        self.module_ids_by_path = {}
+
+    @staticmethod
+    def manifest_path(input_dir):
+        return Path(input_dir) / REPO_MANIFEST_FILENAME
+
+    @classmethod
+    def from_dir(cls, input_dir):
+        manifest = cls(input_dir)
+        manifest._update_file(manifest.books_xml)
+        manifest._scan(manifest.container.pages_root)
+        for path in manifest._collection_paths():
+            manifest._update_file(path)
+        return manifest
+
+    @classmethod
+    def load(cls, input_dir) -> Optional["RepoManifest"]:
+        """Load the manifest saved in ``input_dir`` and bring it up to date
+        with the files on disk"""
+        try:
+            saved = json.loads(
+                cls.manifest_path(input_dir).read_text("utf-8")
+            )
+        except (FileNotFoundError, ValueError):
+            return None
+        if saved.get("root_dir", None) != os.path.realpath(input_dir):
+            # Paths are stale when the repository moved
+            return None
+        manifest = cls(input_dir, saved["directories"], saved["files"])
+        manifest.module_ids_by_path = {
+            p: module_id for module_id, p in saved["modules"].items()
+        }
+        if not manifest._refresh_file(manifest.books_xml):
+            # The books, and where to find them, may have changed
+            manifest = cls.from_dir(input_dir)
+        else:
+            manifest._refresh()
+        return manifest
+
+    def _rel(self, p):
+        p = str(p)
+        prefix = self.root_dir + os.sep
+        # Much cheaper than relpath for the paths under the real root
+        if p.startswith(prefix):
+            return p[len(prefix):]
+        return os.path.relpath(p, self.root_dir)
+
+    def _update_file(self, p, stat=None):
+        try:
+            stat = os.stat(p) if stat is None else stat
+        except FileNotFoundError:
+            self._forget_file(p)
+            return
+        self.files[self._rel(p)] = _file_entry(p, stat)
+        self.changed = True
+
+    def _forget_file(self, p):
+        if self.files.pop(self._rel(p), None) is not None:
+            self.changed = True
+
+    def _refresh_file(self, p):
+        """Update the entry of a file whose size or modification time
+        changed. Returns False when its content changed."""
+        key = self._rel(p)
+        entry = self.files.get(key, None)
+        try:
+            stat = os.stat(p)
+        except FileNotFoundError:
+            self._forget_file(p)
+            return entry is None
+        if entry is not None and _is_current(entry, stat):
+            return True
+        self._update_file(p, stat)
+        return entry is not None and entry["digest"] == self.files[key][
+            "digest"
+        ]
+
+    def _scan(self, directory):
+        """Record ``directory`` and find the modules in it and in the
+        directories below it"""
+        try:
+            stat = os.stat(directory)
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        self.directories[self._rel(directory)] = stat.st_mtime_ns
+        self.changed = True
+        for entry in entries:
+            if entry.is_dir():
+                if self._rel(entry.path) not in self.directories:
+                    self._scan(entry.path)
+            elif (
+                entry.name.endswith(MODULE_FILE_SUFFIX) and
+                entry.path not in self.module_ids_by_path
+            ):
+                module_id = get_module_id(entry.path)
+                if module_id is not None:
+                    self.module_ids_by_path[entry.path] = module_id
+                    self._update_file(entry.path, entry.stat())
+
+    def _forget_directory(self, directory):
+        key = self._rel(directory)
+        prefix = key + os.sep
+        for d in [
+            d for d in self.directories if d == key or d.startswith(prefix)
+        ]:
+            del self.directories[d]
+        for p in [
+            p for p in self.module_ids_by_path
+            if p.startswith(directory + os.sep)
+        ]:
+            self._forget_module(p)
+        self.changed = True
+
+    def _refresh(self):
+        for key, mtime_ns in list(self.directories.items()):
+            if key not in self.directories:
+                # Forgotten along with a parent directory
+                continue
+            directory = os.path.join(self.root_dir, key)
+            try:
+                stat = os.stat(directory)
+            except FileNotFoundError:
+                self._forget_directory(directory)
+                continue
+            if stat.st_mtime_ns != mtime_ns:
+                # Files were added, removed or renamed: look for new
+                # modules and directories in this directory. Removed
+                # modules are forgotten below.
+                self._scan(directory)
+        for p in list(self.module_ids_by_path):
+            self._refresh_file(p)
+            if self._rel(p) not in self.files:
+                self._forget_module(p)
+        if self._rel(self.container.pages_root) not in self.directories:
+            self._scan(self.container.pages_root)
+        for p in self._collection_paths():
+            self._refresh_file(p)
+
+    def _forget_module(self, p):
+        del self.module_ids_by_path[p]
+        self._forget_file(p)
+
+    def _collection_paths(self):
+        return PathResolver(
+            self.container, lambda _: (), get_module_id
+        ).collection_paths_by_book.values()
+
+    def get_path_resolver(self) -> PathResolver:
+        return PathResolver(
+            self.container,
+            lambda _: sorted(self.module_ids_by_path),
+            self.module_ids_by_path.get,
+        )
+
+    def to_dict(self):
+        path_resolver = self.get_path_resolver()
+        return {
+            "root_dir": self.root_dir,
+            "container": self.container.__dict__,
+            "modules": path_resolver.module_paths_by_id,
+            "collections": path_resolver.collection_paths_by_book,
+            "directories": self.directories,
+            "files": self.files,
+        }
+
+    def save(self):
+        manifest_path = self.manifest_path(self.input_dir)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=manifest_path.parent, suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as fout:
+            json.dump(self.to_dict(), fout, default=lambda o: o.__dict__)
+        os.replace(tmp_path, manifest_path)
+        self.changed = False
+
+
+def load_repo_context(input_dir):
+    """Get the container and path resolver of a repository from its
+    manifest when ``neb parse-repo --manifest`` saved one, or by searching
+    the repository otherwise"""
+    manifest = RepoManifest.load(input_dir)
+    if manifest is None:
+        books_xml = Path(input_dir) / "META-INF" / "books.xml"
+        container = BookContainer.from_str(books_xml.read_bytes(), input_dir)
+        path_resolver = PathResolver(
+            container,
+            lambda container: Path(container.pages_root).glob("**/*.cnxml"),
+            get_module_id,
+        )
+        return container, path_resolver
+    if manifest.changed:
+        manifest.save()
+    return manifest.container, manifest.get_path_resolver()
@@ -1,4 +1,5 @@
 import re
+from collections import defaultdict
 from functools import partial
 
 from lxml import etree
@@ -181,16 +182,8 @@ def parse_super_metadata(elm_tree):
     }
 
 
-def parse_metadata(elm_tree):
-    """Given an element-like object (:mod:`lxml.etree`)
-    lookup the metadata and return the found elements
-
-    :param elm_tree: the root xml element
-    :type elm_tree: an element-like object from :mod:`lxml.etree`
-    :returns: common metadata properties
-    :rtype: dict
-
-    """
+def _parse_metadata_xpath(elm_tree):
+    """Same as :func:`parse_metadata` with one xpath query per property"""
     xpath = make_cnx_xpath(elm_tree)
 
     uuid = xpath('//md:uuid/text()')[0]
@@ -223,3 +216,111 @@ def parse_metadata(elm_tree):
         'super_metadata': parse_super_metadata(elm_tree)
     }
     return props
+
+
+_DOCUMENT_TAG = f"{{{NSMAP['c']}}}document"
+_METADATA_ROOT_TAGS = (_DOCUMENT_TAG, f"{{{NSMAP['col']}}}collection")
+_DOCUMENT_TITLE_TAG = f"{{{NSMAP['c']}}}title"
+
+
+class _MetadataFinder:
+    """Find ``md`` elements by local name in document order, walking the
+    document at most once across every lookup. The metadata comes first in
+    cnxml and collxml, so lookups for elements it contains stop there."""
+
+    _prefix = f"{{{NSMAP['md']}}}"
+
+    def __init__(self, root):
+        self._elements = root.iter(f"{self._prefix}*")
+        self._found_by_tag = defaultdict(list)
+
+    def first(self, name, predicate=None):
+        tag = self._prefix + name
+        for elem in self._found_by_tag[tag]:
+            if predicate is None or predicate(elem):
+                return elem
+        for elem in self._elements:
+            self._found_by_tag[elem.tag].append(elem)
+            if elem.tag == tag and (predicate is None or predicate(elem)):
+                return elem
+        return None
+
+    def first_text(self, name):
+        """Same as ``_maybe(xpath('//md:{name}/text()'))``"""
+        elem = self.first(name, lambda elem: _first_text(elem) is not None)
+        return None if elem is None else _first_text(elem)
+
+
+def _first_text(elem):
+    if elem.text:
+        return elem.text
+    for child in elem:
+        if child.tail:
+            return child.tail
+    return None
+
+
+def _required(value, name):
+    if value is None:
+        raise IndexError(f"Expected md:{name}")
+    return value
+
+
+def parse_metadata(elm_tree):
+    """Given an element-like object (:mod:`lxml.etree`)
+    lookup the metadata and return the found elements
+
+    :param elm_tree: the root xml element
+    :type elm_tree: an element-like object from :mod:`lxml.etree`
+    :returns: common metadata properties
+    :rtype: dict
+
+    """
+    root = (
+        elm_tree.getroot()
+        if isinstance(elm_tree, etree._ElementTree)
+        else elm_tree.getroottree().getroot()
+    )
+    if root.tag not in _METADATA_ROOT_TAGS:
+        return _parse_metadata_xpath(elm_tree)
+    md = _MetadataFinder(root)
+
+    uuid = _required(md.first_text('uuid'), 'uuid')
+    version = md.first_text('version')
+    language = md.first_text('language')
+    license_text, license_url = _parse_license(md.first('license'), language)
+    props = {
+        'id': md.first_text('content-id'),
+        'uuid': uuid,
+        'canonical_book_uuid': md.first_text('canonical-book-uuid'),
+        'version': version,
+        'revised': md.first_text('revised'),
+        'title': (
+            ''.join(
+                text
+                for title in (
+                    root.iterchildren(_DOCUMENT_TITLE_TAG)
+                    if root.tag == _DOCUMENT_TAG
+                    else ()
+                )
+                for text in title.itertext()
+            ).strip() or
+            _required(md.first_text('title'), 'title')
+        ),
+        'slug': md.first_text('slug'),
+        'license_url': license_url,
+        'license_text': license_text,
+        'language': language,
+        'abstract': _squash_to_text(
+            md.first('abstract'),
+            remove_namespaces=True,
+        ),
+        # cnx-archive-uri is used extensively in enki/bakery-src
+        'cnx-archive-uri': f"{uuid}@{version or ''}",
+        'super_metadata': (
+            parse_super_metadata(elm_tree)
+            if md.first('super') is not None
+            else None
+        ),
+    }
+    return props
@@ -223,6 +223,162 @@ class TestAssembleIntegration:
         assert "Which statement best compares and contrasts" in html
         assert "To gain scientific knowledge" in html
 
+    def test_streamed_output(
+        self,
+        tmp_path,
+        git_collection_data,
+        exercise_mock,
+        invoker,
+        shutil_stub,
+        save_resource_metadata_stub,
+    ):
+        from nebu.cli.main import cli
+
+        outputs = []
+        for extra_args in ((), ("--stream",)):
+            output_dir = tmp_path / f"build{len(outputs)}"
+            output_dir.mkdir()
+            args = (
+                "assemble",
+                *extra_args,
+                str(git_collection_data),
+                str(output_dir),
+                str(tmp_path),
+            )
+            result = invoker(cli, args)
+            assert result.exit_code == 0, result.exception
+            outputs.append(
+                (output_dir / "collection.assembled.xhtml").read_bytes()
+            )
+
+        normal, streamed = outputs
+        assert streamed == normal
+
+    def test_content_store_output(
+        self,
+        tmp_path,
+        git_collection_data,
+        exercise_mock,
+        invoker,
+        shutil_stub,
+        save_resource_metadata_stub,
+    ):
+        from nebu.cli.main import cli
+
+        outputs = []
+        for extra_args in (
+            (),
+            ("--content-memory", "1"),
+            # Everything is written to temporary files
+            ("--content-memory", "0"),
+        ):
+            output_dir = tmp_path / f"build{len(outputs)}"
+            output_dir.mkdir()
+            args = (
+                "assemble",
+                *extra_args,
+                str(git_collection_data),
+                str(output_dir),
+                str(tmp_path),
+            )
+            result = invoker(cli, args)
+            assert result.exit_code == 0, result.exception
+            outputs.append(
+                (output_dir / "collection.assembled.xhtml").read_bytes()
+            )
+
+        assert outputs[1] == outputs[0]
+        assert outputs[2] == outputs[0]
+
+    def test_media_cache(
+        self,
+        tmp_path,
+        git_collection_data,
+        exercise_mock,
+        invoker,
+        shutil_stub,
+        save_resource_metadata_stub,
+        mocker,
+    ):
+        from nebu import media_utils
+        from nebu.cli.main import cli
+
+        compute = mocker.spy(media_utils, "_compute_media_info")
+        cache_dir = tmp_path / "media-cache"
+        output_dir = tmp_path / "build"
+        output_dir.mkdir()
+        args = (
+            "assemble",
+            "--media-cache-dir",
+            str(cache_dir),
+            str(git_collection_data),
+            str(output_dir),
+            str(tmp_path),
+        )
+        result = invoker(cli, args)
+        assert result.exit_code == 0, result.exception
+        assert compute.call_count > 0
+
+        # The next run reads the media from the cache
+        cache = media_utils.MediaMetadataCache(cache_dir)
+        assert len(cache.entries) == compute.call_count
+        for p in cache.entries:
+            cache.get(p)
+        assert cache.stats == {"hits": compute.call_count}
+
+    def test_offline_replay(
+        self,
+        tmp_path,
+        git_collection_data,
+        add_exercises,
+        exercise_mock,
+        requests_mock,
+        invoker,
+        git_path_resolver,
+        shutil_stub,
+        save_resource_metadata_stub,
+    ):
+        from nebu.cli.main import cli
+
+        add_exercises(Path(git_path_resolver.get_module_path("m46882")))
+        cache_dir = tmp_path / "exercise-cache"
+
+        def run(name, *extra_args):
+            output_dir = tmp_path / name
+            output_dir.mkdir()
+            args = (
+                "assemble",
+                *extra_args,
+                str(git_collection_data),
+                str(output_dir),
+                str(tmp_path),
+            )
+            return invoker(cli, args), output_dir
+
+        result, online_dir = run(
+            "online", "--exercise-cache-dir", str(cache_dir)
+        )
+        assert result.exit_code == 0, result.exception
+        request_count = requests_mock.call_count
+        assert request_count == 2
+
+        result, offline_dir = run(
+            "offline", "--exercise-cache-dir", str(cache_dir), "--offline"
+        )
+        assert result.exit_code == 0, result.exception
+        assert requests_mock.call_count == request_count
+        assert (
+            (offline_dir / "collection.assembled.xhtml").read_bytes() ==
+            (online_dir / "collection.assembled.xhtml").read_bytes()
+        )
+
+        result, _ = run(
+            "missing", "--exercise-cache-dir", str(tmp_path / "empty"),
+            "--offline"
+        )
+        assert result.exit_code != 0
+        assert "Exercise not in cache" in str(result.exception)
+
 
 @pytest.fixture
 def current_snapshot_dir(snapshot_dir):
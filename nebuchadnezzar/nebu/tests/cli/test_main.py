@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 import nebu.cli.main
 
 
@@ -144,3 +147,27 @@ def test_help_formatter_no_cmd(invoker):
     """)
 
     assert ('\n' + result.output) == expected_output
+
+
+def test_cli_import_is_lazy():
+    # Startup should not pay for what only some commands need
+    code = (
+        "import sys, nebu.cli.main, nebu.converters\n"
+        "print(nebu.converters._gen_xsl.cache_info().currsize)\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    compiled, modules = result.stdout.splitlines()
+    assert compiled == "0"
+    imported = {name.split(".")[0] for name in modules.split()}
+    assert not imported & {"requests", "jinja2", "backoff", "git"}
+    import_times = [
+        line.split("|") for line in result.stderr.splitlines()
+        if line.endswith(" nebu.cli.main")
+    ]
+    assert len(import_times) == 1
@@ -65,3 +65,19 @@ def test_parse_repo(assert_match, invoker, src_data):
     assert sorted(parsed["collections"].items()) == sorted(
         path_resolver.collection_paths_by_book.items()
     )
+
+
+def test_parse_repo_manifest(invoker, git_collection_data):
+    from nebu.models.repo_manifest import REPO_MANIFEST_FILENAME
+
+    args = ["parse-repo", str(git_collection_data)]
+    expected = json.loads(invoker(cli, args).output)
+    result = invoker(cli, [*args, "--manifest"])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == expected
+    manifest = json.loads(
+        (git_collection_data / REPO_MANIFEST_FILENAME).read_text()
+    )
+    assert manifest["modules"] == expected["modules"]
+    assert manifest["collections"] == expected["collections"]
@@ -10,8 +10,12 @@ from lxml import etree
 
 from nebu.cli.main import cli
 from nebu.cli.pre_assemble import (
+    get_module_revised_times,
+    get_repo_context,
     handle_super_documents,
+    is_super_document,
     remove_empty_collections_from_container,
+    update_modules,
 )
 from nebu.models.book_container import BookContainer, CONTAINER_NSMAP
 from nebu.models.path_resolver import PathResolver
@@ -119,7 +123,7 @@ def test_pre_assemble_cmd_no_tags(
 
     # WHEN: pre-assemble is called with a ref
     args = ["pre-assemble", str(tmp_book_dir)]
-    mocker.patch("nebu.cli.pre_assemble.Repo", repo_mock)
+    mocker.patch("git.Repo", repo_mock)
     result = invoker(cli, args)
 
     # THEN:
@@ -145,7 +149,7 @@ def test_pre_assemble_patch_paths(
 
     # WHEN: pre-assemble is called
     args = ["pre-assemble", str(tmp_book_dir)]
-    mocker.patch("nebu.cli.pre_assemble.Repo", repo_mock)
+    mocker.patch("git.Repo", repo_mock)
     result = invoker(cli, args)
 
     # THEN:
@@ -341,3 +345,102 @@ def test_empty_collection_removed_from_container(tmp_book_dir_with_super):
         for e in container_tree.xpath("//bk:book", namespaces={"bk": NS_BOOK})
     ]
     assert "collection" not in book_slugs
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_update_modules(datadir, tmp_path, jobs):
+    book_dir = prepare_directory(
+        datadir / "collection_for_git_workflow", tmp_path
+    )
+    container, path_resolver, _ = get_repo_context(str(book_dir))
+    module_paths = path_resolver.module_paths_by_id
+    # m50000 is an orphan that is not in any book
+    canonical_mapping = {
+        module_id: "book-uuid"
+        for module_id in module_paths
+        if module_id != "m50000"
+    }
+    orphan = Path(module_paths["m50000"]).read_bytes()
+    revised_times = {module_paths["m46882"]: "2000-01-01T00:00:00+00:00"}
+
+    update_modules(
+        container,
+        path_resolver,
+        canonical_mapping,
+        "1970-01-01T00:00:00+00:00",
+        jobs,
+        revised_times,
+    )
+
+    assert Path(module_paths["m50000"]).read_bytes() == orphan
+    for module_id in canonical_mapping:
+        tree = open_xml(module_paths[module_id])
+        metadata = {
+            tag: tree.xpath(f"//md:{tag}/text()", namespaces=CNXML_NSMAP)
+            for tag in ("revised", "canonical-book-uuid")
+        }
+        assert metadata == {
+            "revised": [
+                revised_times.get(
+                    module_paths[module_id], "1970-01-01T00:00:00+00:00"
+                )
+            ],
+            "canonical-book-uuid": ["book-uuid"],
+        }
+    # Resource paths are patched in the same pass
+    tree = open_xml(module_paths["m46857"])
+    srcs = tree.xpath(
+        '//c:image[../@id = "image-src-patch-test"]/@src'
+        '|//c:link[../@id = "link-resource-patch-test"]/@resource',
+        namespaces=CNXML_NSMAP,
+    )
+    assert srcs == ["../media/foobar.png", "../media/foobar.png"]
+
+
+def test_is_super_document(datadir):
+    from nebu.models.book_part import BookPart
+
+    modules = datadir / "collection_for_git_workflow_with_super" / "modules"
+    for module_id, expected in (("m50000", False), ("m50001", True)):
+        path = str(modules / f"{module_id}.cnxml")
+        assert is_super_document(path) is expected
+        assert BookPart.doc_from_file(path).is_super is expected
+
+
+def test_get_module_revised_times(tmp_book_dir):
+    from git import Actor, Repo
+
+    repo = Repo.init(tmp_book_dir)
+    author = Actor("nebu", "nebu@example.com")
+    _, path_resolver, _ = get_repo_context(str(tmp_book_dir))
+    module_paths = path_resolver.module_paths_by_id
+    changed_id = sorted(module_paths)[0]
+
+    def commit(paths, timestamp):
+        repo.index.add([str(p) for p in paths])
+        date = f"{timestamp} +0000"
+        repo.index.commit(
+            "commit", author=author, committer=author,
+            author_date=date, commit_date=date,
+        )
+
+    commit(list(module_paths.values()), 1000)
+    Path(module_paths[changed_id]).write_bytes(
+        Path(module_paths[changed_id]).read_bytes() + b"\n"
+    )
+    commit([module_paths[changed_id]], 2000)
+    untracked = tmp_book_dir / "modules" / "untracked.cnxml"
+    untracked.write_text("<document/>")
+
+    revised_times = get_module_revised_times(
+        str(tmp_book_dir), [*module_paths.values(), str(untracked)]
+    )
+
+    assert revised_times == {
+        module_path: (
+            "1970-01-01T00:33:20+00:00"
+            if module_id == changed_id
+            else "1970-01-01T00:16:40+00:00"
+        )
+        for module_id, module_path in module_paths.items()
+    }
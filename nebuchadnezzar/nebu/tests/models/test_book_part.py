@@ -39,3 +39,31 @@ def test_collection_from_file(assert_match, parts_tuple):
     assert all(
         doc.metadata["id"] in docs_by_id for doc in collection.documents
     )
+
+
+def test_collection_from_file_jobs(parts_tuple, git_path_resolver):
+    from nebu.models.book_part import BookPart
+
+    collection, serial_docs_by_id, serial_docs_by_uuid = parts_tuple
+    parallel_collection, docs_by_id, docs_by_uuid = (
+        BookPart.collection_from_file(
+            git_path_resolver.get_collection_path("collection"),
+            git_path_resolver,
+            jobs=2,
+        )
+    )
+
+    def flatten(book_part):
+        return [
+            (
+                part.type,
+                part.metadata,
+                None if part.content is None else etree_to_str(part.content),
+            )
+            for part in book_part.flatten()
+        ]
+
+    # Converting in a process pool should not change anything
+    assert flatten(parallel_collection) == flatten(collection)
+    assert list(docs_by_id) == list(serial_docs_by_id)
+    assert list(docs_by_uuid) == list(serial_docs_by_uuid)
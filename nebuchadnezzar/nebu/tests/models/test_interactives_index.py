@@ -0,0 +1,36 @@
+from nebu.h5p_injection import load_h5p_interactive
+from nebu.models.interactives_index import InteractivesIndex
+
+
+def test_find_interactives_paths(git_path_resolver):
+    interactives = InteractivesIndex(git_path_resolver)
+    for interactive_id, parts in (
+        ("f9ef58e", ("media/assemble-h5p-test-image.png",)),
+        ("f9ef58e", ("media", "assemble-h5p-test-image.png")),
+        ("f9ef58e", ("./media/../media/assemble-h5p-test-image.png",)),
+        ("f9ef58e", ("media/missing.png",)),
+        ("c20fad8", ("content.json",)),
+        ("c20fad8", ()),
+        ("missing", ("content.json",)),
+        ("f9ef58e", ("../c20fad8/content.json",)),
+    ):
+        assert interactives.find_interactives_paths(
+            interactive_id, *parts
+        ) == git_path_resolver.find_interactives_paths(
+            interactive_id, *parts
+        ), (interactive_id, parts)
+
+
+def test_load(git_path_resolver):
+    interactives = InteractivesIndex(git_path_resolver)
+    for nickname in ("c20fad8", "f9ef58e", "missing"):
+        expected = load_h5p_interactive(
+            git_path_resolver.get_public_interactives_path(nickname)
+        )
+        assert interactives.load(nickname) == expected
+
+    first = interactives.load("c20fad8")
+    first["metadata"]["tags"] = ["changed"]
+    # Each caller gets a copy of the interactive, which is only loaded once
+    assert interactives.load("c20fad8")["metadata"] != first["metadata"]
+    assert interactives.stats == {"loads": 3, "hits": 2}
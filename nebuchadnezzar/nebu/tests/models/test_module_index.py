@@ -0,0 +1,45 @@
+import os
+
+from nebu.models.module_index import (
+    ModuleIndex,
+    ModuleMetadata,
+    read_module_metadata,
+)
+from nebu.parse import parse_metadata
+from nebu.xml_utils import open_xml
+
+
+def test_read_module_metadata(git_path_resolver):
+    for module_path in git_path_resolver.module_paths_by_id.values():
+        metadata = parse_metadata(open_xml(module_path))
+        assert read_module_metadata(module_path) == ModuleMetadata(
+            uuid=metadata["uuid"],
+            title=metadata["title"],
+            canonical_book_uuid=metadata["canonical_book_uuid"],
+        )
+
+
+def test_module_index(git_collection_data, git_path_resolver):
+    module_paths = list(git_path_resolver.module_paths_by_id.values())
+    module_index = ModuleIndex.from_dir(git_collection_data)
+    module_index.update(module_paths)
+    module_index.save()
+    assert not module_index.changed
+
+    # Entries are reused from disk until their module changes
+    module_index = ModuleIndex.from_dir(git_collection_data)
+    module_path = module_paths[0]
+    expected = module_index.get(module_path)
+    assert not module_index.changed
+    with open(module_path, "rb") as fin:
+        cnxml = fin.read()
+    with open(module_path, "wb") as fout:
+        fout.write(cnxml.replace(expected.uuid.encode(), b"new-uuid", 1))
+    stat = os.stat(module_path)
+    os.utime(module_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert module_index.get(module_path).uuid == "new-uuid"
+    assert module_index.changed
+
+    # Modules that are gone are forgotten
+    module_index.update(module_paths[1:])
+    assert len(module_index.entries) == len(module_paths) - 1
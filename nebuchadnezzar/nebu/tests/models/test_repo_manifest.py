@@ -0,0 +1,95 @@
+import json
+import shutil
+from pathlib import Path
+
+from nebu.models.path_resolver import PathResolver
+from nebu.models.repo_manifest import (
+    REPO_MANIFEST_FILENAME,
+    RepoManifest,
+    get_module_id,
+    load_repo_context,
+)
+
+
+def search_repo(container):
+    return PathResolver(
+        container,
+        lambda container: Path(container.pages_root).glob("**/*.cnxml"),
+        get_module_id,
+    )
+
+
+def assert_matches_search(manifest):
+    expected = search_repo(manifest.container)
+    path_resolver = manifest.get_path_resolver()
+    assert path_resolver.module_paths_by_id == expected.module_paths_by_id
+    assert (
+        path_resolver.collection_paths_by_book ==
+        expected.collection_paths_by_book
+    )
+
+
+def test_repo_manifest(git_collection_data):
+    manifest = RepoManifest.from_dir(str(git_collection_data))
+    assert_matches_search(manifest)
+    manifest.save()
+    saved = json.loads(
+        (git_collection_data / REPO_MANIFEST_FILENAME).read_text()
+    )
+    assert set(saved["files"]) == {
+        "META-INF/books.xml",
+        "collection.xml",
+        *(f"modules/{p.name}" for p in git_collection_data.glob("**/*.cnxml")),
+    }
+
+    # Nothing changed
+    manifest = RepoManifest.load(str(git_collection_data))
+    assert not manifest.changed
+    assert_matches_search(manifest)
+
+    # Modules are added, removed, moved and changed
+    modules = git_collection_data / "modules"
+    (modules / "unit").mkdir()
+    shutil.copy(modules / "m46882.cnxml", modules / "unit" / "m60000.cnxml")
+    (modules / "m50000.cnxml").unlink()
+    (modules / "m46909.cnxml").rename(modules / "unit" / "m46909.cnxml")
+    with (modules / "m46913.cnxml").open("ab") as fout:
+        fout.write(b"\n")
+    manifest = RepoManifest.load(str(git_collection_data))
+    assert manifest.changed
+    assert_matches_search(manifest)
+    assert manifest.files["modules/m46913.cnxml"]["digest"] != saved[
+        "files"
+    ]["modules/m46913.cnxml"]["digest"]
+    manifest.save()
+
+    # A directory is removed
+    shutil.rmtree(modules / "unit")
+    manifest = RepoManifest.load(str(git_collection_data))
+    assert_matches_search(manifest)
+    assert "modules/unit" not in manifest.directories
+
+
+def test_repo_manifest_container_changed(git_collection_data):
+    RepoManifest.from_dir(str(git_collection_data)).save()
+    books_xml = git_collection_data / "META-INF" / "books.xml"
+    books_xml.write_text(
+        books_xml.read_text().replace('slug="collection"', 'slug="book"')
+    )
+    manifest = RepoManifest.load(str(git_collection_data))
+    assert [book.slug for book in manifest.container.books] == ["book"]
+    assert_matches_search(manifest)
+
+
+def test_load_repo_context(git_collection_data):
+    container, path_resolver = load_repo_context(str(git_collection_data))
+    assert not (git_collection_data / REPO_MANIFEST_FILENAME).exists()
+    expected = path_resolver.module_paths_by_id
+
+    RepoManifest.from_dir(str(git_collection_data)).save()
+    (git_collection_data / "modules" / "m50000.cnxml").unlink()
+    del expected["m50000"]
+    container, path_resolver = load_repo_context(str(git_collection_data))
+    assert path_resolver.module_paths_by_id == expected
+    # The refreshed manifest is saved
+    assert not RepoManifest.load(str(git_collection_data)).changed
@@ -0,0 +1,48 @@
+import os
+
+from lxml import etree
+
+from nebu.content_store import ContentStore
+from nebu.models.book_part import BookPart, PartType
+
+
+def test_spill(tmp_path):
+    text = os.urandom(500).hex().encode()
+    html = b"<html><body><p>" + text + b"</p></body></html>"
+    store = ContentStore(memory_budget=100, spill_dir=tmp_path)
+    in_memory = store.put_bytes(b"<p/>")
+    spilled = store.put_bytes(html)
+    assert (len(store._in_memory), store.spilled) == (1, 1)
+    assert store.get_bytes(in_memory) == b"<p/>"
+    assert store.get_bytes(spilled) == html
+    assert etree.tostring(store.get(spilled)) == html
+
+    # Replacing an entry frees the memory it used
+    store.put_bytes(b"<div/>", in_memory)
+    assert store.get_bytes(in_memory) == b"<div/>"
+    assert store.memory_size == len(store._in_memory[in_memory])
+
+    store.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_book_part_content(tmp_path):
+    with ContentStore(memory_budget=0, spill_dir=tmp_path) as store:
+        doc = BookPart.doc_from_converted(
+            {"uuid": "a"}, "<html><body><p id='x'/></body></html>", store
+        )
+        assert doc._content is None
+        doc.content.find(".//p").set("id", "y")
+        # Unchanged content is dropped
+        doc.release_content(changed=False)
+        assert doc.content.find(".//p").get("id") == "x"
+        doc.content.find(".//p").set("id", "y")
+        doc.release_content()
+        assert doc._content is None
+        assert doc.content.find(".//p").get("id") == "y"
+
+    # Without a store the tree is kept
+    doc = BookPart(PartType.DOCUMENT, {}, etree.fromstring("<html/>"))
+    content = doc.content
+    doc.release_content()
+    assert doc.content is content
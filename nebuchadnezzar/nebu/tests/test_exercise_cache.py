@@ -0,0 +1,50 @@
+import pytest
+
+from nebu.exercise_cache import ExerciseCache, ExerciseCacheMiss
+from nebu.exercise_client import ExerciseClient
+
+
+EXERCISE_JSON = {"total_count": 1, "items": [{"nickname": "an-exercise"}]}
+
+
+def test_get_put(tmp_path):
+    cache = ExerciseCache(tmp_path / "cache")
+    url = "https://exercises.openstax.org/api/exercises?q=tag:a-tag"
+    assert cache.get(url, False) is None
+    cache.put(url, False, EXERCISE_JSON, '"v1"')
+    entry = cache.get(url, False)
+    assert entry["data"] == EXERCISE_JSON
+    assert entry["etag"] == '"v1"'
+    assert cache.is_fresh(entry)
+    assert cache.get(url, True) is None
+    # The cache persists between instances
+    assert ExerciseCache(tmp_path / "cache", ttl=0).get(url, False) == entry
+    assert not ExerciseCache(tmp_path / "cache", ttl=0).is_fresh(entry)
+
+
+def test_client_cache_revalidation(tmp_path, requests_mock):
+    url = "https://exercises.openstax.org/api/exercises?q=tag:a-tag"
+    requests_mock.get(url, json=EXERCISE_JSON, headers={"ETag": '"v1"'})
+    cache = ExerciseCache(tmp_path)
+
+    assert ExerciseClient(cache=cache).get_json(url) == EXERCISE_JSON
+    # Fresh entries are used without asking the server
+    assert ExerciseClient(cache=cache).get_json(url) == EXERCISE_JSON
+    assert requests_mock.call_count == 1
+    # Tokens include answers, so they get their own entries
+    with pytest.raises(ExerciseCacheMiss):
+        ExerciseClient("token", cache=cache, offline=True).get_json(url)
+
+    # Stale entries are revalidated with their ETag
+    cache.ttl = 0
+    requests_mock.get(url, status_code=304)
+    client = ExerciseClient(cache=cache)
+    assert client.get_json(url) == EXERCISE_JSON
+    assert requests_mock.last_request.headers["If-None-Match"] == '"v1"'
+    assert client.cache_stats["revalidated"] == 1
+
+    # Offline mode ignores the ttl
+    requests_mock.get(url, status_code=500)
+    offline_client = ExerciseClient(cache=cache, offline=True)
+    assert offline_client.get_json(url) == EXERCISE_JSON
+    assert requests_mock.call_count == 2
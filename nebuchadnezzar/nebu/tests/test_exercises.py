@@ -226,8 +226,17 @@ def patch_requests(monkeypatch):
                 return MockResponse("", 500)
         return MockResponse({}, 404)
 
-    monkeypatch.setattr("nebu.formatters.requests.get", mocked_requests_get)
-    monkeypatch.setattr("nebu.formatters.requests.post", mocked_requests_post)
+    patch_session_get(monkeypatch, mocked_requests_get)
+    monkeypatch.setattr(
+        "nebu.exercise_client.requests.post", mocked_requests_post
+    )
+
+
+def patch_session_get(monkeypatch, mocked_get):
+    monkeypatch.setattr(
+        "nebu.exercise_client.requests.Session.get",
+        lambda _, *args, **kwargs: mocked_get(*args, **kwargs),
+    )
 
 
 def mocked_requests_post(*args, **kwargs):
@@ -305,7 +314,7 @@ def test_no_tags(assert_match, fake_doc, monkeypatch):
 
     includes = [exercise_callback_factory(exercise_match, EXERCISE_URL, None)]
 
-    monkeypatch.setattr("nebu.formatters.requests.get", exercise_no_tags)
+    patch_session_get(monkeypatch, exercise_no_tags)
 
     insert_includes(fake_doc, [""], includes)
     assert_match(fix_namespaces(fake_doc), "document.xhtml")
@@ -324,8 +333,82 @@ def test_feature(assert_match, fake_doc, monkeypatch):
 
     includes = [exercise_callback_factory(exercise_match, EXERCISE_URL, None)]
 
-    monkeypatch.setattr("nebu.formatters.requests.get", exercise_mod_tags)
+    patch_session_get(monkeypatch, exercise_mod_tags)
 
     with pytest.raises(Exception) as e:
         insert_includes(fake_doc, ["a", "b", "c"], includes)
         assert len(re.findall(r"Feature .+? not in .+? href=.+?", str(e))) == 4
+
+
+def test_client_fetches_each_url_once(monkeypatch, caplog):
+    from nebu.exercise_client import ExerciseClient
+
+    requested = []
+
+    def counting_get(url, **kwargs):
+        requested.append(url)
+        return MockResponse(EXERCISE_JSON, 200)
+
+    patch_session_get(monkeypatch, counting_get)
+    client = ExerciseClient()
+    url = EXERCISE_URL.format(itemCode="apbio-ch03-ex002")
+
+    first = client.get_json(url)
+    first["items"][0]["url"] = url
+    second = client.get_json(url)
+
+    assert requested == [url]
+    # Every caller gets a copy it is free to modify
+    assert second == EXERCISE_JSON
+    assert "url" not in second["items"][0]
+
+    with caplog.at_level("INFO", logger="nebuchadnezzar"):
+        client.log_stats()
+    assert "1 requests for 1 urls" in caplog.text
+
+
+def test_concurrent_includes_splice_in_order(fake_doc):
+    from nebu.xml_utils import xpath_html
+
+    xpath = '//xhtml:a[contains(@href, "#ost/api/ex/")]'
+    expected = [elem.get("href") for elem in xpath_html(fake_doc, xpath)]
+    spliced = []
+
+    def _record(elem, page_uuids):
+        href = elem.get("href")
+
+        def _splice():
+            spliced.append(href)
+            elem.getparent().remove(elem)
+        return _splice
+
+    insert_includes(fake_doc, [""], [(xpath, _record, True)])
+
+    assert len(expected) > 1
+    assert spliced == expected
+    assert xpath_html(fake_doc, xpath) == []
+
+
+def test_id_index():
+    from nebu.formatters import IdIndex
+    from nebu.xml_utils import etree_from_str
+
+    root = etree_from_str(
+        '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+        '<div data-type="page" id="page_a"><p id="auto_a_x"/><p/></div>'
+        '<div data-type="page" id="page_b"><p id="auto_b_x"/></div>'
+        '</body></html>'
+    )
+    page_a, page_b = root[0]
+    id_index = IdIndex(root)
+    assert id_index.get("auto_a_x") is page_a[0]
+    assert id_index.get("auto_c_x") is None
+    assert id_index.in_page("auto_a_x", page_a)
+    assert not id_index.in_page("auto_a_x", page_b)
+    # Pages are not in themselves
+    assert not id_index.in_page("page_a", page_a)
+
+    fragment = etree_from_str('<div><p id="auto_b_y"/></div>')
+    page_b.append(fragment)
+    id_index.add(fragment, page_b)
+    assert id_index.in_page("auto_b_y", page_b)
@@ -0,0 +1,90 @@
+from lxml import etree
+
+from nebu import formatters
+from nebu.formatters import (
+    IdIndex,
+    parse_context_tags,
+    resolve_module_links,
+    resolve_module_links_and_update_ids,
+    update_ids,
+)
+from nebu.models.book_part import BookPart
+from nebu.xml_utils import etree_from_str
+
+
+def test_resolve_module_links_and_update_ids(git_path_resolver):
+    def rewritten(single_pass):
+        _, docs_by_id, docs_by_uuid = BookPart.collection_from_file(
+            git_path_resolver.get_collection_path("collection"),
+            git_path_resolver,
+        )
+        for document in docs_by_uuid.values():
+            if single_pass:
+                resolve_module_links_and_update_ids(
+                    document, docs_by_id, git_path_resolver
+                )
+            else:
+                resolve_module_links(document, docs_by_id, git_path_resolver)
+                update_ids(document)
+        return {
+            uuid: etree.tostring(document.content)
+            for uuid, document in docs_by_uuid.items()
+        }
+
+    assert rewritten(single_pass=True) == rewritten(single_pass=False)
+
+
+def test_resolve_module_links_and_update_ids_fragments():
+    html = (
+        '<html xmlns="http://www.w3.org/1999/xhtml" id="root"><body>'
+        '<a href="#later">ns</a><a xmlns="" href="#later">no ns</a>'
+        '<span href="#later">not a link</span>'
+        '<a href="/m1#x">same book</a><a href="/m1">page</a>'
+        '<p id="later"/><a href="#missing"/>'
+        '</body></html>'
+    )
+
+    class Document:
+        def __init__(self):
+            self.content = etree_from_str(html)
+            self.metadata = {"id": "m2", "uuid": "u2"}
+
+    docs_by_id = {"m1": Document()}
+    docs_by_id["m1"].metadata = {"id": "m1", "uuid": "u1"}
+    expected, actual = Document(), Document()
+    resolve_module_links(expected, docs_by_id, None)
+    update_ids(expected)
+    resolve_module_links_and_update_ids(actual, docs_by_id, None)
+
+    assert etree.tostring(actual.content) == etree.tostring(expected.content)
+    assert b'href="#auto_u2_later">ns' in etree.tostring(actual.content)
+    assert b'href="#auto_u1_x"' in etree.tostring(actual.content)
+
+
+def test_parse_context_tags_without_id_index(mocker):
+    root = etree_from_str(
+        '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+        '<div data-type="page" id="page_u1"><p id="auto_u1_f1"/>'
+        '<a id="exercise1"/></div>'
+        '<div data-type="page" id="page_u2"><p id="auto_u2_f2"/>'
+        '<a id="exercise2"/></div>'
+        '</body></html>'
+    )
+    id_index = IdIndex(root)
+    page_uuids = {"u1", "u2"}
+    cases = (
+        # The feature is on the parent page
+        ("exercise1", ["context-cnxmod:u2", "context-cnxfeature:f1"], "u1"),
+        # The feature is on another page
+        ("exercise2", ["context-cnxmod:u1", "context-cnxfeature:f1"], "u1"),
+    )
+    new_index = mocker.spy(formatters.IdIndex, "__init__")
+    for elem_id, tags, expected in cases:
+        elem = root.xpath(f'//*[@id="{elem_id}"]')[0]
+        for index in (id_index, None):
+            assert parse_context_tags(tags, elem, page_uuids, index) == (
+                expected,
+                tags[1].split(":")[1],
+            )
+    # The lookup falls back to the parent page instead of indexing the book
+    assert new_index.call_count == 0
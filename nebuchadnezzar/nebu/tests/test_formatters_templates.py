@@ -35,3 +35,28 @@ def test_assemble_collection(assert_match, parts_tuple):
         ),
         "collection.assembled.xhtml",
     )
+
+
+@pytest.mark.parametrize("extra_metadata", [
+    {},
+    {"language": "pl", "created": "2020-01-01", "slug": "a-book"},
+    {"revised": None, "title": "A <b>bold</b> & brave title"},
+])
+def test_assemble_collection_matches_templates(
+    parts_tuple, monkeypatch, extra_metadata
+):
+    from lxml import etree
+    from nebu import formatters
+
+    collection, _, _ = parts_tuple
+    collection.metadata.update(extra_metadata)
+
+    def to_bytes(root):
+        return etree.tostring(root, pretty_print=True, encoding="utf-8")
+
+    built = to_bytes(assemble_collection(collection))
+    with monkeypatch.context() as m:
+        m.setattr(formatters, "_is_buildable", lambda _: False)
+        rendered = to_bytes(assemble_collection(collection))
+
+    assert built == rendered
@@ -0,0 +1,80 @@
+import os
+
+from nebu.html_cache import HTMLCache, get_xsl_digest
+from nebu.models.book_part import BookPart
+from nebu.xml_utils import etree_to_str
+
+
+def test_get_put(tmp_path):
+    cache = HTMLCache(tmp_path / "cache")
+    cnxml = tmp_path / "m1.cnxml"
+    cnxml.write_text("<document/>")
+
+    key = cache.key_for_file(cnxml)
+    assert cache.get(key) is None
+    cache.put(key, "<html/>")
+    assert cache.get(key) == "<html/>"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Different cnxml, different key
+    cnxml.write_text("<document></document>")
+    assert cache.key_for_file(cnxml) != key
+
+    # The cache persists between instances
+    assert HTMLCache(tmp_path / "cache").get(key) == "<html/>"
+
+
+def test_xsl_digest(tmp_path):
+    xsl_dir = tmp_path / "xsl"
+    (xsl_dir / "nested").mkdir(parents=True)
+    (xsl_dir / "a.xsl").write_text("a")
+    (xsl_dir / "nested" / "b.xsl").write_text("b")
+    before = get_xsl_digest(xsl_dir)
+    assert before == get_xsl_digest(xsl_dir)
+    (xsl_dir / "nested" / "b.xsl").write_text("c")
+    assert before != get_xsl_digest(xsl_dir)
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = HTMLCache(tmp_path, max_size=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    os.utime(tmp_path / "a.xhtml", (0, 0))
+    os.utime(tmp_path / "b.xhtml", (1, 1))
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == "aaaa"
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.size == 8
+
+
+def test_collection_from_file_cached(tmp_path, parts_tuple, git_path_resolver):
+    collection, _, _ = parts_tuple
+    collection_path = git_path_resolver.get_collection_path("collection")
+
+    def flatten(book_part):
+        return [
+            (
+                part.metadata,
+                None if part.content is None else etree_to_str(part.content),
+            )
+            for part in book_part.flatten()
+        ]
+
+    expected = flatten(collection)
+    module_count = len(set(d.metadata["id"] for d in collection.documents))
+
+    for jobs in (1, 2):
+        cache = HTMLCache(tmp_path / str(jobs))
+        cold, _, _ = BookPart.collection_from_file(
+            collection_path, git_path_resolver, jobs=jobs, html_cache=cache
+        )
+        warm, _, _ = BookPart.collection_from_file(
+            collection_path, git_path_resolver, jobs=jobs, html_cache=cache
+        )
+        assert flatten(cold) == expected
+        assert flatten(warm) == expected
+        assert cache.misses == module_count
+        assert cache.hits >= module_count
@@ -66,3 +66,32 @@ def test_get_media_metadata(test_image):
     sha1, metadata = media_utils.get_media_metadata(test_image.media_file, True)
     assert metadata == expected_metadata
     assert sha1 == test_image.sha1
+
+
+def test_media_metadata_cache(test_image, tmp_path, mocker):
+    from concurrent.futures import ThreadPoolExecutor
+
+    compute = mocker.spy(media_utils, "_compute_media_info")
+    cache_dir = tmp_path / "media-cache"
+    cache = media_utils.MediaMetadataCache(cache_dir)
+    for is_image in (True, False):
+        assert media_utils.get_media_metadata(
+            test_image.media_file, is_image, cache
+        ) == media_utils.get_media_metadata(test_image.media_file, is_image)
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(cache.get, [test_image.media_file] * 8))
+    assert compute.call_count == 1
+    assert cache.stats == {"hits": 9, "misses": 1}
+    cache.save()
+
+    # Entries are reused between runs until the file changes
+    cache = media_utils.MediaMetadataCache(cache_dir)
+    cache.prefetch(test_image.media_file)
+    cache.prefetch(str(tmp_path / "missing.png"))
+    assert compute.call_count == 1
+    stat = os.stat(test_image.media_file)
+    os.utime(
+        test_image.media_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1)
+    )
+    assert cache.get(test_image.media_file)[0] == test_image.sha1
+    assert compute.call_count == 2
@@ -346,3 +346,58 @@ def test_parse_super_metadata(snapshot):
     props = parse_metadata(xml)
 
     assert_props_match(snapshot, props)
+
+
+def _metadata_or_error(parse, xml):
+    try:
+        return parse(xml)
+    except Exception as e:
+        return type(e)
+
+
+def test_parse_matches_xpath_queries(datadir):
+    from nebu.parse import _parse_metadata_xpath
+    from nebu.xml_utils import open_xml
+
+    paths = [
+        *datadir.glob("**/*.cnxml"),
+        *datadir.glob("**/*collection*.xml"),
+    ]
+    assert len(paths) > 5
+    for path in paths:
+        xml = open_xml(str(path))
+        assert parse_metadata(xml) == _parse_metadata_xpath(xml), path
+
+
+@pytest.mark.parametrize("xml", [
+    # md elements outside of the metadata and missing from it
+    """<collection xmlns="http://cnx.rice.edu/collxml"
+            xmlns:md="http://cnx.rice.edu/mdml">
+        <metadata><md:uuid>a</md:uuid></metadata>
+        <content><subcollection><md:title>Sub</md:title></subcollection>
+        </content>
+    </collection>""",
+    # Empty elements and mixed content
+    """<document xmlns="http://cnx.rice.edu/cnxml"
+            xmlns:md="http://cnx.rice.edu/mdml">
+        <title>A <emphasis>b</emphasis> c</title>
+        <metadata><md:uuid/><md:uuid><!-- a -->b</md:uuid>
+        <md:version></md:version><md:version>2</md:version></metadata>
+    </document>""",
+    # The root is not a cnxml document or a collection
+    """<div xmlns:md="http://cnx.rice.edu/mdml">
+        <md:title>Title</md:title><md:uuid>a</md:uuid>
+    </div>""",
+    # Missing uuid
+    """<document xmlns="http://cnx.rice.edu/cnxml"
+            xmlns:md="http://cnx.rice.edu/mdml">
+        <metadata><md:title>Title</md:title></metadata>
+    </document>""",
+])
+def test_parse_matches_xpath_queries_for_odd_documents(xml):
+    from nebu.parse import _parse_metadata_xpath
+
+    root = etree.fromstring(xml)
+    expected = _metadata_or_error(_parse_metadata_xpath, root)
+    assert _metadata_or_error(parse_metadata, root) == expected
+    assert _metadata_or_error(parse_metadata, root[-1]) == expected
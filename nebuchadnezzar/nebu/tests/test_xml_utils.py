@@ -172,3 +172,89 @@ def test_fromstring(xml_doc, type):
     tree = etree_from_str(xml_doc)
     assert len(tree) > 0, f"{type}: failed to parse"
     assert len(tree.xpath('//a')) > 0, f"{type}: bad parsing result"
+
+
+def test_write_fixed_namespaces(tmp_path, datadir):
+    from nebu.xml_utils import open_xml, write_fixed_namespaces
+
+    doc_path = datadir / "desserts-single-page.xhtml"
+    out = tmp_path / "out.xhtml"
+    # With and without whitespace between the elements, which decides
+    # whether they are indented
+    for parser in (None, etree.XMLParser(remove_blank_text=True)):
+        expected = fix_namespaces(open_xml(str(doc_path), parser).getroot())
+        root = open_xml(str(doc_path), parser).getroot()
+        body = root.find("{http://www.w3.org/1999/xhtml}body")
+
+        write_fixed_namespaces(root, str(out))
+
+        assert out.read_bytes() == expected
+        # Written elements are released
+        assert len(body) == 0
+
+
+MATHML_DOCTYPE = (
+    '<!DOCTYPE math PUBLIC "-//W3C//DTD MathML 2.0//EN" '
+    '"http://www.w3.org/Math/DTD/mathml2/mathml2.dtd">\n'
+)
+
+
+def test_catalog_resolves_entities_offline(mocker):
+    from nebu.xml_utils import XML_RESOLVER
+
+    read = mocker.spy(XML_RESOLVER, "_read")
+    xml = MATHML_DOCTYPE + (
+        '<math xmlns="http://www.w3.org/1998/Math/MathML">'
+        '<mi>&alpha;&amp;&InvisibleTimes;</mi></math>'
+    )
+    for _ in range(2):
+        tree = etree_from_str(xml.encode())
+        assert tree.findtext(".//{*}mi") == "α&⁢"
+    assert read.call_count == 2
+    # The DTD is read from disk once per process
+    assert len(XML_RESOLVER._contents) == 1
+
+
+def test_catalog_resolves_cnxml_entities(tmp_path, caplog):
+    from nebu.xml_utils import open_xml
+
+    module = tmp_path / "index.cnxml"
+    module.write_text(
+        '<!DOCTYPE document PUBLIC '
+        '"-//CNX//DTD CNXML 0.7 plus MathML//EN" '
+        '"http://cnx.rice.edu/cnxml/0.7/DTD/cnxml_mathml.dtd">\n'
+        '<document xmlns="http://cnx.rice.edu/cnxml">'
+        '<para>a&nbsp;b</para></document>'
+    )
+    para = open_xml(str(module)).getroot()[0]
+    assert para.text == "a\u00a0b"
+    assert "Not fetching" not in caplog.text
+
+
+def test_catalog_resolver_does_not_fetch(tmp_path):
+    from nebu.xml_utils import open_xml
+
+    doc = tmp_path / "doc.xml"
+    doc.write_text(
+        '<!DOCTYPE a SYSTEM "http://example.com/a.dtd"><a>text</a>'
+    )
+    assert open_xml(str(doc)).getroot().text == "text"
+
+
+def test_catalog_resolver_extra_catalogs(tmp_path):
+    from nebu.xml_utils import BUNDLED_XML_CATALOG, CatalogResolver
+
+    (tmp_path / "a.dtd").write_text('<!ENTITY greeting "hello">')
+    catalog = tmp_path / "catalog.xml"
+    catalog.write_text(
+        '<catalog xmlns="urn:oasis:names:tc:entity:xmlns:xml:catalog">'
+        '<system systemId="http://example.com/a.dtd" uri="a.dtd"/>'
+        '</catalog>'
+    )
+    parser = etree.XMLParser(load_dtd=True, no_network=True)
+    parser.resolvers.add(CatalogResolver([BUNDLED_XML_CATALOG, catalog]))
+    root = etree.fromstring(
+        b'<!DOCTYPE a SYSTEM "http://example.com/a.dtd"><a>&greeting;</a>',
+        parser,
+    )
+    assert root.text == "hello"
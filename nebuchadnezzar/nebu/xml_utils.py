@@ -6,7 +6,11 @@
 # See LICENCE.txt for details.
 # ###
 """Various standalone utility functions that provide specific outcomes"""
+import os
 import re
+import logging
+import threading
+from pathlib import Path
 from typing import Union
 
 from lxml import etree
@@ -27,39 +31,147 @@ Element = etree._Element
 ElementTree = etree._ElementTree
 Elementish = Union[Element, ElementTree]
 
+logger = logging.getLogger("nebuchadnezzar")
+
+XML_CATALOG_FILES_ENV = "NEB_XML_CATALOG_FILES"
+BUNDLED_XML_CATALOG = Path(__file__).parent / "catalog" / "catalog.xml"
+XML_CATALOG_NS = "urn:oasis:names:tc:entity:xmlns:xml:catalog"
+
+
+class CatalogResolver(etree.Resolver):
+    """Resolve DTDs and entity sets listed in OASIS XML catalogs. Each file
+    is read once per process and served from memory; anything else that is
+    not local resolves to nothing instead of being fetched."""
+
+    def __init__(self, catalog_files):
+        super().__init__()
+        self.by_public_id = {}
+        self.by_system_id = {}
+        self._contents = {}
+        self._lock = threading.Lock()
+        for catalog_file in catalog_files:
+            self.add_catalog(catalog_file)
+
+    def add_catalog(self, catalog_file):
+        catalog_dir = os.path.dirname(os.path.abspath(catalog_file))
+        catalog = etree.parse(str(catalog_file))
+        for tag, attr, mapping in (
+            ("public", "publicId", self.by_public_id),
+            ("system", "systemId", self.by_system_id),
+        ):
+            for entry in catalog.iter(f"{{{XML_CATALOG_NS}}}{tag}"):
+                mapping[entry.get(attr)] = os.path.join(
+                    catalog_dir, entry.get("uri")
+                )
+
+    def _read(self, path):
+        with self._lock:
+            content = self._contents.get(path, None)
+            if content is None:
+                with open(path, "rb") as f:
+                    content = self._contents[path] = f.read()
+        return content
+
+    def resolve(self, system_url, public_id, context):
+        path = self.by_public_id.get(public_id, None)
+        if path is None:
+            path = self.by_system_id.get(system_url, None)
+        if path is not None:
+            return self.resolve_string(
+                self._read(path), context, base_url=path
+            )
+        if system_url is not None and re.match(r"[a-z]+://", system_url) \
+                and not system_url.startswith("file://"):
+            logger.warning(f"Not fetching {public_id or system_url}")
+            return self.resolve_empty(context)
+        return None
+
+
+def _get_catalog_files():
+    return [
+        BUNDLED_XML_CATALOG,
+        *os.environ.get(XML_CATALOG_FILES_ENV, "").split(),
+    ]
+
+
 XML_PARSER_OPTIONS = {
     'load_dtd': True,
     'resolve_entities': True,
-    'no_network': False,   # don't force loading our cnxml/DTD packages
+    'no_network': True,   # DTDs come from CatalogResolver instead
     'attribute_defaults': False,
 }
+XML_RESOLVER = CatalogResolver(_get_catalog_files())
 DEFAULT_XMLPARSER = etree.XMLParser(**XML_PARSER_OPTIONS)
+DEFAULT_XMLPARSER.resolvers.add(XML_RESOLVER)
+
+TOP_LEVEL_NSMAP = {
+    None: "http://www.w3.org/1999/xhtml",
+    "m": "http://www.w3.org/1998/Math/MathML",
+    "epub": "http://www.idpf.org/2007/ops",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "lrmi": "http://lrmi.net/the-specification",
+    "bib": "http://bibtexml.sf.net/",
+    "data": "http://www.w3.org/TR/html5/dom.html#custom-data-attribute",
+    "qml": "http://cnx.rice.edu/qml/1.0",
+    "datadev": "http://dev.w3.org/html5/spec/#custom",
+    "mod": "http://cnx.rice.edu/#moduleIds",
+    "md": "http://cnx.rice.edu/mdml",
+    "c": "http://cnx.rice.edu/cnxml",
+}
 
 
 def fix_namespaces(root):
     # Get rid of unused namespaces and put them all in the root tag
-    nsmap = {
-        None: "http://www.w3.org/1999/xhtml",
-        "m": "http://www.w3.org/1998/Math/MathML",
-        "epub": "http://www.idpf.org/2007/ops",
-        "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
-        "dc": "http://purl.org/dc/elements/1.1/",
-        "lrmi": "http://lrmi.net/the-specification",
-        "bib": "http://bibtexml.sf.net/",
-        "data": "http://www.w3.org/TR/html5/dom.html#custom-data-attribute",
-        "qml": "http://cnx.rice.edu/qml/1.0",
-        "datadev": "http://dev.w3.org/html5/spec/#custom",
-        "mod": "http://cnx.rice.edu/#moduleIds",
-        "md": "http://cnx.rice.edu/mdml",
-        "c": "http://cnx.rice.edu/cnxml",
-    }
-
     # lxml has a built in function to do this without destroying comments
-    etree.cleanup_namespaces(root, top_nsmap=nsmap)
+    etree.cleanup_namespaces(root, top_nsmap=TOP_LEVEL_NSMAP)
 
     return etree_to_str(root)
 
 
+def write_fixed_namespaces(root, f):
+    """Like ``fix_namespaces``, but write the result to the file ``f`` one
+    child of the body at a time instead of serializing the whole tree into
+    a single bytes object. The tree itself is still held in memory; children
+    of the body are removed from ``root`` once they are written so that they
+    can be freed.
+
+    """
+    etree.cleanup_namespaces(root, top_nsmap=TOP_LEVEL_NSMAP)
+    body = root.find(f"{{{TOP_LEVEL_NSMAP[None]}}}body")
+    children = [] if body is None else list(body)
+    with open(f, "wb") as out:
+        if not children:
+            out.write(etree_to_str(root))
+            return
+        # libxml2 only indents the children of an element without text
+        # children, so keep some (empty) text in the body while its children
+        # are written one by one if any of them has a tail
+        if body.text is None and any(c.tail is not None for c in children):
+            body.text = ""
+        # Serialize the tree with two markers in the body to find the bytes
+        # before, between and after the children of the body
+        markers = [etree.Comment("nebu-split") for _ in range(2)]
+        body[:] = markers
+        marker = etree_to_str(markers[0], pretty_print=False)
+        skeleton = etree_to_str(root)
+        end = skeleton.rindex(marker)
+        start = skeleton.rindex(marker, 0, end)
+        head = skeleton[:start]
+        separator = skeleton[start + len(marker):end]
+        tail_length = len(skeleton) - end - len(marker)
+        out.write(head)
+        for i, child in enumerate(children):
+            if i:
+                out.write(separator)
+            body[:] = [child]
+            out.write(etree_to_str(root)[len(head):-tail_length])
+            body.remove(child)
+        out.write(skeleton[-tail_length:])
+        if body.text == "":
+            body.text = None
+
+
 def open_xml(p, parser=DEFAULT_XMLPARSER):
     return etree.parse(p, parser)
 